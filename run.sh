@@ -42,6 +42,10 @@ GITHUB_TOKEN=""
 OIDC_PROVIDER_ARN=""
 STACK_NAME=""
 POLICIES_DIR=""
+JOURNAL=""
+RESUME=false
+NO_STREAM_EVENTS=false
+CANCEL_ON_FAILURE=false
 
 # Function to display usage
 show_usage() {
@@ -60,6 +64,10 @@ Optional Arguments:
   --policies-dir DIR      Custom directory containing policy JSON files (default: policies/)
   --policy-file FILE      Custom IAM policy file
   --output FILE           Output file for CloudFormation template
+  --journal FILE          Record stack/repo outcomes in this rollout journal
+  --resume                Retry only pending or failed items from the journal
+  --no-stream-events      Do not stream CloudFormation stack events during deploy
+  --cancel-on-failure     Cancel the stack update as soon as a resource fails
   --test, --tests         Run tests only
   --render-only           Only render templates, don't deploy
 
@@ -69,6 +77,7 @@ Examples:
   $0 --github-org myorg --github-repo myrepo --github-token ghp_xxx
   $0 --github-org myorg --github-repo myrepo --stack-name my-custom-stack
   $0 --github-org myorg --github-repo myrepo --policies-dir /path/to/my/policies
+  $0 --github-org myorg --github-repo myrepo --github-token ghp_xxx --resume
   $0 --test
   $0 --render-only --github-org myorg --github-repo myrepo
 
@@ -101,6 +110,14 @@ while [[ $# -gt 0 ]]; do
       POLICY_FILE="$2"; shift 2;;
     --output)
       OUTPUT_FILE="$2"; shift 2;;
+    --journal)
+      JOURNAL="$2"; shift 2;;
+    --resume)
+      RESUME=true; shift;;
+    --no-stream-events)
+      NO_STREAM_EVENTS=true; shift;;
+    --cancel-on-failure)
+      CANCEL_ON_FAILURE=true; shift;;
     --test|--tests)
       RUN_TESTS=true; shift;;
     --render-only)
@@ -170,6 +187,18 @@ fi
 if [[ -n "$POLICIES_DIR" ]]; then
   CFN_ARGS+=(--policies-dir "$POLICIES_DIR")
 fi
+if [[ -n "$JOURNAL" ]]; then
+  CFN_ARGS+=(--journal "$JOURNAL")
+fi
+if [ "$RESUME" = true ]; then
+  CFN_ARGS+=(--resume)
+fi
+if [ "$NO_STREAM_EVENTS" = true ]; then
+  CFN_ARGS+=(--no-stream-events)
+fi
+if [ "$CANCEL_ON_FAILURE" = true ]; then
+  CFN_ARGS+=(--cancel-on-failure)
+fi
 python3 src/cfn_deploy.py "${CFN_ARGS[@]}"
 
 # Example usage of generator
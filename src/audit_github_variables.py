@@ -0,0 +1,360 @@
+"""
+audit_github_variables.py: Audit GHA_OIDC_ROLE_ARN across many repos against the deployed role ARNs
+User Story: US-140 (see docs/user_stories.md)
+
+GitHub's GraphQL API does not expose Actions variables, so the audit combines:
+- batched GraphQL queries (many repos per request, paginated org listing) to resolve
+  which repos exist and are not archived, so missing repos cost no REST calls;
+- concurrent REST reads of the variable over one pooled HTTP session, sent as
+  conditional requests with cached ETags (304 responses do not count against the
+  REST rate limit), backing off when GitHub signals a rate limit.
+Expected role ARNs come from stack outputs, read with one paginated describe_stacks.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from src import aws_clients
+    from src.set_github_variable import GITHUB_API
+except ImportError:  # executed as a script from src/
+    import aws_clients
+    from set_github_variable import GITHUB_API
+
+GRAPHQL_URL = f"{GITHUB_API}/graphql"
+DEFAULT_VAR_NAME = "GHA_OIDC_ROLE_ARN"
+DEFAULT_ETAG_CACHE = "github_etag_cache.json"
+DEFAULT_WORKERS = 32
+GRAPHQL_BATCH_SIZE = 50
+MAX_RATE_LIMIT_WAIT = 60
+
+STATUS_CORRECT = "correct"
+STATUS_STALE = "stale"
+STATUS_MISSING = "missing"
+STATUS_UNKNOWN = "no_expected_arn"
+STATUS_REPO_NOT_FOUND = "repo_not_found"
+STATUS_ARCHIVED = "archived"
+STATUS_ERROR = "error"
+# Statuses that fail the audit; an unknown expected ARN must not pass silently
+FAILING_STATUSES = (STATUS_MISSING, STATUS_STALE, STATUS_UNKNOWN, STATUS_ERROR)
+# Also fails when repos were listed explicitly: GraphQL returns null both for missing
+# repos and for repos the token cannot see, e.g. a token scoped to the wrong org
+EXPLICIT_REPO_FAILING_STATUSES = FAILING_STATUSES + (STATUS_REPO_NOT_FOUND,)
+
+
+def make_session(github_token, workers=DEFAULT_WORKERS):
+    """
+    Returns a requests.Session whose connection pool fits the worker count.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=workers)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {github_token}",
+        "Accept": "application/vnd.github+json",
+    })
+    return session
+
+
+def _wait_for_rate_limit(resp):
+    """
+    Sleeps if the response is a primary or secondary rate limit. Returns True if it slept.
+    """
+    if resp.status_code not in (403, 429):
+        return False
+    retry_after = resp.headers.get("Retry-After")
+    if retry_after:
+        delay = float(retry_after)
+    elif resp.headers.get("X-RateLimit-Remaining") == "0":
+        delay = float(resp.headers.get("X-RateLimit-Reset", time.time())) - time.time()
+    else:
+        return False
+    delay = min(max(delay, 1), MAX_RATE_LIMIT_WAIT)
+    print(f"Rate limited by GitHub, waiting {delay:.0f}s...", file=sys.stderr, flush=True)
+    time.sleep(delay)
+    return True
+
+
+def _graphql(session, query, variables):
+    for _ in range(3):
+        resp = session.post(GRAPHQL_URL, json={"query": query, "variables": variables})
+        if not _wait_for_rate_limit(resp):
+            break
+    resp.raise_for_status()
+    return resp.json()
+
+
+def resolve_repos(session, repos, batch_size=GRAPHQL_BATCH_SIZE):
+    """
+    Looks up many repos per GraphQL query. Returns {"org/repo": None | {"archived": bool}}.
+    None means the repo does not exist or the token cannot see it.
+    """
+    result = {}
+    for start in range(0, len(repos), batch_size):
+        batch = repos[start:start + batch_size]
+        params, fields, variables = [], [], {}
+        for i, full_name in enumerate(batch):
+            owner, name = full_name.split("/", 1)
+            params.append(f"$o{i}: String!, $n{i}: String!")
+            fields.append(f"r{i}: repository(owner: $o{i}, name: $n{i}) {{ nameWithOwner isArchived }}")
+            variables[f"o{i}"], variables[f"n{i}"] = owner, name
+        query = f"query({', '.join(params)}) {{ {' '.join(fields)} }}"
+        body = _graphql(session, query, variables)
+        if body.get("data") is None:
+            raise ValueError(f"GraphQL query failed: {body.get('errors')}")
+        data = body["data"]
+        for i, full_name in enumerate(batch):
+            node = data.get(f"r{i}")
+            result[full_name] = {"archived": node["isArchived"]} if node else None
+    return result
+
+
+def list_org_repos(session, org):
+    """
+    Lists every non-archived repo in an org with paginated GraphQL (100 per page).
+    Returns {"org/repo": {"archived": False}}, the same shape as resolve_repos().
+    """
+    query = """
+    query($org: String!, $cursor: String) {
+      organization(login: $org) {
+        repositories(first: 100, after: $cursor) {
+          nodes { nameWithOwner isArchived }
+          pageInfo { hasNextPage endCursor }
+        }
+      }
+    }
+    """
+    repos, cursor = {}, None
+    while True:
+        data = _graphql(session, query, {"org": org, "cursor": cursor})
+        org_data = (data.get("data") or {}).get("organization")
+        if not org_data:
+            raise ValueError(f"Organization not found or not visible to token: {org}")
+        page = org_data["repositories"]
+        repos.update((n["nameWithOwner"], {"archived": False}) for n in page["nodes"] if not n["isArchived"])
+        if not page["pageInfo"]["hasNextPage"]:
+            return repos
+        cursor = page["pageInfo"]["endCursor"]
+
+
+class EtagCache:
+    """
+    Thread-safe {url: {"etag", "value"}} cache persisted as JSON between audits.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self.lock = threading.Lock()
+        self.entries = {}
+        if self.path and self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except json.JSONDecodeError:
+                self.entries = {}
+
+    def get(self, url):
+        with self.lock:
+            return self.entries.get(url)
+
+    def put(self, url, etag, value):
+        with self.lock:
+            if etag:
+                self.entries[url] = {"etag": etag, "value": value}
+            else:
+                self.entries.pop(url, None)
+
+    def save(self):
+        if self.path:
+            with self.lock:
+                self.path.write_text(json.dumps(self.entries))
+
+
+def fetch_variable(session, full_name, var_name, cache):
+    """
+    Reads one repo variable with a conditional GET.
+    Returns (value or None if the variable is missing, error message or None, served_from_cache).
+    """
+    url = f"{GITHUB_API}/repos/{full_name}/actions/variables/{var_name}"
+    for _ in range(3):
+        cached = cache.get(url)
+        headers = {"If-None-Match": cached["etag"]} if cached else {}
+        resp = session.get(url, headers=headers)
+        if not _wait_for_rate_limit(resp):
+            break
+    if resp.status_code == 304 and cached:
+        return cached["value"], None, True
+    if resp.status_code == 404:
+        cache.put(url, None, None)
+        return None, None, False
+    if not resp.ok:
+        return None, f"{resp.status_code} {resp.text[:200]}", False
+    value = resp.json().get("value")
+    cache.put(url, resp.headers.get("ETag"), value)
+    return value, None, False
+
+
+def expected_role_arns(region, prefix="gha-aws-oidc-"):
+    """
+    Returns {stack_name: RoleArn output} for matching stacks using paginated describe_stacks.
+    """
+    cloudformation = aws_clients.client("cloudformation", region)
+    arns = {}
+    for page in cloudformation.get_paginator("describe_stacks").paginate():
+        for stack in page.get("Stacks", []):
+            if not stack["StackName"].startswith(prefix):
+                continue
+            for output in stack.get("Outputs", []):
+                if output["OutputKey"] == "RoleArn":
+                    arns[stack["StackName"]] = output["OutputValue"]
+    return arns
+
+
+def default_stack_name(full_name):
+    org, repo = full_name.split("/", 1)
+    return f"gha-aws-oidc-{org.lower()}-{repo.lower()}"
+
+
+def org_stack_name(full_name):
+    """
+    Returns the org-wide stack cfn_deploy.py deploys when run without --github-repo.
+    """
+    return f"gha-aws-oidc-{full_name.split('/', 1)[0].lower()}"
+
+
+def expected_from_stacks(arns):
+    """
+    Returns an expected_for callable that prefers a repo's own stack and falls back
+    to its org-wide stack, whose role cfn_deploy.py pushes to every listed repo.
+    """
+    def expected_for(full_name):
+        return arns.get(default_stack_name(full_name)) or arns.get(org_stack_name(full_name))
+    return expected_for
+
+
+def audit(session, repos, expected_for, var_name=DEFAULT_VAR_NAME, workers=DEFAULT_WORKERS, cache=None,
+          repo_info=None):
+    """
+    Audits the variable on every repo.
+    Args:
+        session: requests.Session from make_session().
+        repos (list): "org/repo" names.
+        expected_for (callable): "org/repo" -> expected role ARN, or None if unknown.
+        repo_info (dict, optional): resolve_repos()-shaped lookup already known to the caller
+            (e.g. from list_org_repos), which skips the GraphQL resolution.
+    Returns:
+        list of {"repo", "status", "value", "expected", "error"} dicts, in input order.
+    """
+    cache = cache or EtagCache()
+    if repo_info is None:
+        repo_info = resolve_repos(session, repos)
+
+    def check(full_name):
+        entry = {"repo": full_name, "value": None, "expected": expected_for(full_name), "error": None}
+        info = repo_info.get(full_name)
+        if info is None:
+            entry["status"] = STATUS_REPO_NOT_FOUND
+            return entry
+        if info["archived"]:
+            entry["status"] = STATUS_ARCHIVED
+            return entry
+        value, error, _cached = fetch_variable(session, full_name, var_name, cache)
+        entry["value"] = value
+        if error:
+            entry["status"], entry["error"] = STATUS_ERROR, error
+        elif value is None:
+            entry["status"] = STATUS_MISSING
+        elif entry["expected"] is None:
+            entry["status"] = STATUS_UNKNOWN
+        else:
+            entry["status"] = STATUS_CORRECT if value == entry["expected"] else STATUS_STALE
+        return entry
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(check, repos))
+
+
+def _read_repos(repos_file, default_org):
+    repos = []
+    for line in Path(repos_file).read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            repos.append(line if "/" in line else f"{default_org}/{line}")
+    return repos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audit a GitHub Actions variable across repos against deployed role ARNs")
+    parser.add_argument("--github-org", required=True, help="GitHub organization name")
+    parser.add_argument("--github-repo", help="Audit a single repository")
+    parser.add_argument("--repos-file", help="File listing repos (one per line, default: allowed_repos.txt)")
+    parser.add_argument("--all-org-repos", action="store_true", help="Audit every non-archived repo in the org")
+    parser.add_argument("--github-token", required=True, help="GitHub Personal Access Token (PAT)")
+    parser.add_argument("--var-name", default=DEFAULT_VAR_NAME, help=f"Variable to audit (default: {DEFAULT_VAR_NAME})")
+    parser.add_argument("--expected-arn", help="Expected value for every repo (skips the stack lookup)")
+    parser.add_argument("--stack-name", help="Single stack whose RoleArn output every repo should use")
+    parser.add_argument("--region", default="us-east-1", help="AWS region of the stacks")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent REST requests")
+    parser.add_argument("--etag-cache", default=DEFAULT_ETAG_CACHE, help=f"ETag cache file (default: {DEFAULT_ETAG_CACHE})")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    session = make_session(args.github_token, args.workers)
+    repo_info = None
+    if args.github_repo:
+        repos = [f"{args.github_org}/{args.github_repo}"]
+    elif args.all_org_repos:
+        repo_info = list_org_repos(session, args.github_org)
+        repos = list(repo_info)
+    else:
+        repos_file = args.repos_file or "allowed_repos.txt"
+        if not Path(repos_file).exists():
+            print(f"Repos file not found: {repos_file}", file=sys.stderr)
+            sys.exit(1)
+        repos = _read_repos(repos_file, args.github_org)
+
+    if args.expected_arn:
+        expected_for = lambda full_name: args.expected_arn
+    else:
+        arns = expected_role_arns(args.region)
+        if args.stack_name:
+            shared = arns.get(args.stack_name)
+            if shared is None:
+                print(f"Stack {args.stack_name} has no RoleArn output in {args.region}", file=sys.stderr)
+                sys.exit(1)
+            expected_for = lambda full_name: shared
+        else:
+            expected_for = expected_from_stacks(arns)
+
+    cache = EtagCache(args.etag_cache)
+    results = audit(session, repos, expected_for, args.var_name, args.workers, cache, repo_info)
+    cache.save()
+    elapsed = time.perf_counter() - start
+
+    counts = {}
+    for entry in results:
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    if args.json:
+        print(json.dumps({"counts": counts, "results": results}, indent=2))
+    else:
+        for entry in results:
+            if entry["status"] == STATUS_CORRECT:
+                continue
+            detail = entry["error"] or f"{entry['value']!r} (expected {entry['expected']!r})"
+            print(f"❌ {entry['repo']}: {entry['status']} {detail}")
+        summary = ", ".join(f"{status}={count}" for status, count in sorted(counts.items()))
+        print(f"Audited {len(results)} repos in {elapsed:.1f}s: {summary}")
+    failing = FAILING_STATUSES if args.all_org_repos else EXPLICIT_REPO_FAILING_STATUSES
+    if any(entry["status"] in failing for entry in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+aws_clients.py: Shared, thread-safe boto3 session/client pool with adaptive retries
+User Story: US-100 (see docs/user_stories.md)
+
+boto3 clients are thread-safe but sessions are not, so sessions and clients are
+created once per (profile, region, service) under a lock and then shared by all
+worker threads. Clients use botocore's "adaptive" retry mode (client-side rate
+limiting on throttling) and a connection pool sized for fleet concurrency, and
+every call's retries and throttling errors are counted for the caller.
+"""
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_MAX_ATTEMPTS = 10
+
+# Same codes botocore's standard/adaptive retry handlers treat as throttling
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "ProvisionedThroughputExceededException",
+    "TransactionInProgressException",
+    "RequestLimitExceeded",
+    "BandwidthLimitExceeded",
+    "LimitExceededException",
+    "SlowDown",
+    "PriorRequestNotComplete",
+    "EC2ThrottledException",
+}
+
+
+class ClientPool:
+    """
+    Caches boto3 sessions per profile and clients per (profile, region, service).
+    Safe to share across threads. stats() returns call, retry and throttle counters.
+    """
+
+    def __init__(self, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 retry_mode="adaptive"):
+        self.config = Config(
+            retries={"mode": retry_mode, "max_attempts": max_attempts},
+            max_pool_connections=max_pool_connections,
+        )
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._clients = {}
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "errors": 0, "retries": 0, "throttles": 0}
+
+    def session(self, profile=None):
+        """
+        Returns the cached boto3 Session for a profile (None = default credential chain).
+        """
+        with self._lock:
+            return self._session_locked(profile)
+
+    def _session_locked(self, profile):
+        session = self._sessions.get(profile)
+        if session is None:
+            session = boto3.session.Session(profile_name=profile)
+            self._sessions[profile] = session
+        return session
+
+    def client(self, service, region=None, profile=None):
+        """
+        Returns a shared client for the service in the region/profile, creating it on first use.
+        """
+        key = (profile, region, service)
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._session_locked(profile).client(service, region_name=region, config=self.config)
+                client.meta.events.register("needs-retry", self._on_needs_retry)
+                client.meta.events.register("after-call", self._on_after_call)
+                client.meta.events.register("after-call-error", self._on_after_call_error)
+                self._clients[key] = client
+        return client
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self._stats[name] += delta
+
+    def _on_needs_retry(self, response=None, caught_exception=None, **kwargs):
+        # Called after every attempt; only count attempts rejected for throttling
+        if response is not None:
+            code = (response[1] or {}).get("Error", {}).get("Code")
+            if code in THROTTLING_ERROR_CODES:
+                self._count(throttles=1)
+
+    def _on_after_call(self, http_response=None, parsed=None, **kwargs):
+        # Fires once per API call (after all retries), for success and error responses alike
+        retries = (parsed or {}).get("ResponseMetadata", {}).get("RetryAttempts", 0)
+        failed = http_response is not None and http_response.status_code >= 300
+        self._count(calls=1, retries=retries, errors=int(failed))
+
+    def _on_after_call_error(self, **kwargs):
+        # Transport failures (e.g. connection errors) that never produced a response
+        self._count(calls=1, errors=1)
+
+    def stats(self):
+        """
+        Returns a snapshot of {"calls", "errors", "retries", "throttles"} across all pooled clients.
+        """
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    """
+    Returns the process-wide ClientPool, creating it on first use.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ClientPool()
+        return _default_pool
+
+
+def client(service, region=None, profile=None):
+    """
+    Shortcut for default_pool().client(...).
+    """
+    return default_pool().client(service, region, profile)
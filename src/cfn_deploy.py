@@ -3,14 +3,35 @@ cfn_deploy.py: Minimal CloudFormation stack deployment automation
 User Story: US-XXX (see docs/user_stories.md)
 """
 import subprocess
+import tempfile
+from datetime import datetime, timezone
 from pathlib import Path
 import argparse
 import sys
-import boto3
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+try:
+    from src import aws_clients, rollout_journal, stack_events, state_store
+except ImportError:  # executed as a script from src/
+    import aws_clients
+    import rollout_journal
+    import stack_events
+    import state_store
 
 TEMPLATE_PATH = Path(__file__).parent.parent / "cloudformation" / "generated" / "iam_role.yaml"
 DEFAULT_REGION = "us-east-1"
 
+def _deploy_command(stack_name, region, oidc_provider_arn, template_path=None):
+    return [
+        "aws", "cloudformation", "deploy",
+        "--stack-name", stack_name,
+        "--template-file", str(template_path or TEMPLATE_PATH),
+        "--region", region,
+        "--parameter-overrides", f"OIDCProviderArn={oidc_provider_arn}",
+        "--capabilities", "CAPABILITY_NAMED_IAM"
+    ]
+
 def deploy_stack(stack_name, region=DEFAULT_REGION, oidc_provider_arn=None):
     """
     Deploys the CloudFormation stack using AWS CLI.
@@ -23,22 +44,72 @@ def deploy_stack(stack_name, region=DEFAULT_REGION, oidc_provider_arn=None):
     """
     if not TEMPLATE_PATH.exists():
         raise FileNotFoundError(f"Template not found: {TEMPLATE_PATH}")
-    result = subprocess.run([
-        "aws", "cloudformation", "deploy",
-        "--stack-name", stack_name,
-        "--template-file", str(TEMPLATE_PATH),
-        "--region", region,
-        "--parameter-overrides", f"OIDCProviderArn={oidc_provider_arn}",
-        "--capabilities", "CAPABILITY_NAMED_IAM"
-    ], capture_output=True, text=True)
+    result = subprocess.run(_deploy_command(stack_name, region, oidc_provider_arn), capture_output=True, text=True)
     return result
 
+def deploy_stacks_streaming(stack_names, region=DEFAULT_REGION, oidc_provider_arn=None, cancel_on_failure=False,
+                            poll_interval=stack_events.DEFAULT_POLL_INTERVAL, cloudformation=None, template_path=None):
+    """
+    Deploys one or more stacks concurrently while streaming their stack events.
+    Args:
+        stack_names (list): Stacks to deploy from the rendered template.
+        region (str): AWS region to deploy in.
+        oidc_provider_arn (str, optional): OIDC provider ARN.
+        cancel_on_failure (bool): Cancel a stack update as soon as its first resource fails.
+        poll_interval (float): Seconds between stack event polls.
+        cloudformation: boto3 CloudFormation client (shared pooled client if omitted).
+        template_path (Path, optional): Rendered template to deploy (default: TEMPLATE_PATH).
+    Returns:
+        tuple: ({stack_name: subprocess.CompletedProcess}, {stack_name: first failed event or None})
+    """
+    template_path = Path(template_path or TEMPLATE_PATH)
+    if not template_path.exists():
+        raise FileNotFoundError(f"Template not found: {template_path}")
+    if cloudformation is None:
+        cloudformation = aws_clients.client("cloudformation", region)
+    since = datetime.now(timezone.utc)
+    procs = {}
+    for name in stack_names:
+        # Temp files instead of pipes so a chatty deploy can never block on a full pipe
+        stdout, stderr = tempfile.TemporaryFile("w+"), tempfile.TemporaryFile("w+")
+        cmd = _deploy_command(name, region, oidc_provider_arn, template_path)
+        procs[name] = (cmd, subprocess.Popen(cmd, stdout=stdout, stderr=stderr, text=True), stdout, stderr)
+
+    def on_failure(name, event):
+        if cancel_on_failure:
+            stack_events.cancel_update(cloudformation, name)
+
+    try:
+        failures = stack_events.follow_stacks(
+            cloudformation, stack_names,
+            is_running=lambda name: procs[name][1].poll() is None,
+            on_failure=on_failure, poll_interval=poll_interval, since=since,
+        )
+    except (ClientError, BotoCoreError) as e:
+        # Event streaming is only progress output; keep waiting on the deploys themselves
+        print(f"Stopped streaming stack events: {e}", file=sys.stderr, flush=True)
+        failures = {name: None for name in stack_names}
+    except KeyboardInterrupt:
+        for name, (_cmd, proc, _out, _err) in procs.items():
+            if proc.poll() is None:
+                stack_events.cancel_update(cloudformation, name)
+        raise
+    results = {}
+    for name, (cmd, proc, stdout, stderr) in procs.items():
+        returncode = proc.wait()
+        stdout.seek(0)
+        stderr.seek(0)
+        results[name] = subprocess.CompletedProcess(cmd, returncode, stdout.read(), stderr.read())
+        stdout.close()
+        stderr.close()
+    return results, failures
+
 def get_or_create_oidc_provider(region):
     """
     Returns the ARN for the GitHub Actions OIDC provider in this AWS account.
     If it does not exist, creates it and returns the ARN.
     """
-    iam = boto3.client("iam", region_name=region)
+    iam = aws_clients.client("iam", region)
     provider_url = "https://token.actions.githubusercontent.com"
     # 1. Check if provider exists
     resp = iam.list_open_id_connect_providers()
@@ -90,7 +161,13 @@ if __name__ == "__main__":
     parser.add_argument("--oidc-provider-arn", required=False, help="OIDC provider ARN for GitHub Actions")
     parser.add_argument("--stack-name", required=False, help="Custom CloudFormation stack name (overrides default naming)")
     parser.add_argument("--policies-dir", required=False, help="Custom directory containing policy JSON files (default: policies/)")
+    parser.add_argument("--journal", required=False, help=f"Append stack and repo outcomes to this rollout journal (default with --resume: {rollout_journal.DEFAULT_JOURNAL_PATH})")
+    parser.add_argument("--resume", action="store_true", help="Skip the deploy if the journal records this template as deployed, and only retry pending repos")
+    parser.add_argument("--no-stream-events", action="store_true", help="Do not stream CloudFormation stack events during the deploy")
+    parser.add_argument("--cancel-on-failure", action="store_true", help="Cancel the stack update as soon as the first resource fails")
+    parser.add_argument("--state-db", default=state_store.DEFAULT_DB_PATH, help=f"Local state database updated after the deploy (default: {state_store.DEFAULT_DB_PATH})")
     args = parser.parse_args()
+    journal_path = args.journal or (rollout_journal.DEFAULT_JOURNAL_PATH if args.resume else None)
 
     # Compose unique stack name
     if args.stack_name:
@@ -112,25 +189,39 @@ if __name__ == "__main__":
     else:
         oidc_provider_arn = get_or_create_oidc_provider(args.region)
         print(f"OIDC Provider ARN: {oidc_provider_arn}")
-    res = subprocess.run([
-        "aws", "cloudformation", "deploy",
-        "--stack-name", STACK_NAME,
-        "--template-file", str(TEMPLATE_PATH),
-        "--region", args.region,
-        "--parameter-overrides", f"OIDCProviderArn={oidc_provider_arn}",
-        "--capabilities", "CAPABILITY_NAMED_IAM"
-    ], capture_output=True, text=True)
-    print(res.stdout)
-    if res.returncode != 0:
-        print(res.stderr)
-        exit(res.returncode)
+    stack_key = f"{args.region}/{STACK_NAME}"
+    stack_fp = None
+    if journal_path and TEMPLATE_PATH.exists():
+        stack_fp = rollout_journal.fingerprint(TEMPLATE_PATH.read_text(), oidc_provider_arn)
+    deployed = False
+    if args.resume and rollout_journal.is_done(rollout_journal.load_latest(journal_path), "stack", stack_key, stack_fp):
+        print(f"Resuming: stack {STACK_NAME} already deployed with this template, skipping deploy.")
+    else:
+        if journal_path:
+            rollout_journal.append_entry(journal_path, "stack", stack_key, rollout_journal.STATUS_STARTED, stack_fp)
+        if args.no_stream_events:
+            res = deploy_stack(STACK_NAME, args.region, oidc_provider_arn)
+        else:
+            results, _failures = deploy_stacks_streaming([STACK_NAME], args.region, oidc_provider_arn,
+                                                         cancel_on_failure=args.cancel_on_failure)
+            res = results[STACK_NAME]
+        print(res.stdout)
+        if journal_path:
+            status = rollout_journal.STATUS_SUCCEEDED if res.returncode == 0 else rollout_journal.STATUS_FAILED
+            rollout_journal.append_entry(journal_path, "stack", stack_key, status, stack_fp,
+                                         detail=res.stderr.strip() or None)
+        if res.returncode != 0:
+            print(res.stderr)
+            exit(res.returncode)
+        deployed = True
     # Print IAM Role name from stack outputs
-    import json
-    import boto3
-    cf = boto3.client("cloudformation", region_name=args.region)
+    cf = aws_clients.client("cloudformation", args.region)
     stack = cf.describe_stacks(StackName=STACK_NAME)["Stacks"][0]
     outputs = {o["OutputKey"]: o["OutputValue"] for o in stack.get("Outputs", [])}
     role_arn = outputs.get("RoleArn")
+    template_hash, policy_hash = state_store.template_hashes(TEMPLATE_PATH)
+    state_store.record_stack(state_store.connect(args.state_db), STACK_NAME, args.region, role_arn,
+                             template_hash, policy_hash, deployed=deployed)
     if role_arn:
         role_name = role_arn.split("/")[-1]
         print(f"Created/updated IAM Role name: {role_name}")
@@ -138,29 +229,40 @@ if __name__ == "__main__":
         import subprocess
         import os
         github_token = args.github_token or os.environ.get("GITHUB_TOKEN")
+        journal_args = ["--state-db", args.state_db]
+        if journal_path:
+            journal_args += ["--journal", journal_path]
+        if args.resume:
+            journal_args.append("--resume")
+        sync_returncode = 0
         if github_token:
             if args.github_org and args.github_repo:
                 print(f"Setting GHA_OIDC_ROLE_ARN GitHub Actions variable for {args.github_org}/{args.github_repo}...")
-                subprocess.run([
+                sync_returncode = subprocess.run([
                     sys.executable, "src/set_github_variable.py",
                     "--github-org", args.github_org,
                     "--github-repo", args.github_repo,
                     "--github-token", github_token,
                     "--var-name", "GHA_OIDC_ROLE_ARN",
                     "--var-value", role_arn
-                ], check=False)
+                ] + journal_args, check=False).returncode
             else:
                 print("Setting GHA_OIDC_ROLE_ARN GitHub Actions variable for all repos in allowed_repos.txt...")
-                subprocess.run([
+                sync_returncode = subprocess.run([
                     sys.executable, "src/set_github_variable.py",
                     "--github-org", args.github_org,
                     "--github-token", github_token,
                     "--var-name", "GHA_OIDC_ROLE_ARN",
                     "--var-value", role_arn,
                     "--repos-file", "allowed_repos.txt"
-                ], check=False)
+                ] + journal_args, check=False).returncode
         else:
             repo = args.github_repo
             print_manual_github_oidc_instructions(role_arn, args.github_org, repo)
     else:
         print("IAM Role ARN not found in stack outputs.")
+    stats = aws_clients.default_pool().stats()
+    print(f"AWS API calls: {stats['calls']} (retries: {stats['retries']}, throttled: {stats['throttles']}, errors: {stats['errors']})")
+    if role_arn and sync_returncode:
+        # Some repos were not updated; the journal lets a --resume run retry just those
+        exit(sync_returncode)
@@ -26,23 +26,11 @@ def get_subs_from_repos(repos_file):
                 subs.append(f"repo:{repo}:ref:refs/heads/*")
     return subs
 
-def main():
-    parser = argparse.ArgumentParser(description="Generate a GitHub OIDC trust policy JSON from allowed_repos.txt or individual repo")
-    parser.add_argument("--repos-file", help="File listing repos (one per line)")
-    parser.add_argument("--github-org", help="GitHub organization name")
-    parser.add_argument("--github-repo", help="GitHub repository name")
-    parser.add_argument("--output", default="cloudformation/generated/trust_policy.json", help="Output JSON file")
-    args = parser.parse_args()
-    
-    # If individual repo is specified, use that; otherwise use repos file
-    if args.github_org and args.github_repo:
-        subs = [f"repo:{args.github_org}/{args.github_repo}:ref:refs/heads/*"]
-    elif args.repos_file:
-        subs = get_subs_from_repos(args.repos_file)
-    else:
-        # Default fallback to allowed_repos.txt if neither is specified
-        subs = get_subs_from_repos("allowed_repos.txt")
-    trust_policy = {
+def build_trust_policy(subs):
+    """
+    Returns the OIDC trust policy allowing the given token subject patterns.
+    """
+    return {
         "Version": "2012-10-17",
         "Statement": [
             {
@@ -59,6 +47,24 @@ def main():
             }
         ]
     }
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a GitHub OIDC trust policy JSON from allowed_repos.txt or individual repo")
+    parser.add_argument("--repos-file", help="File listing repos (one per line)")
+    parser.add_argument("--github-org", help="GitHub organization name")
+    parser.add_argument("--github-repo", help="GitHub repository name")
+    parser.add_argument("--output", default="cloudformation/generated/trust_policy.json", help="Output JSON file")
+    args = parser.parse_args()
+    
+    # If individual repo is specified, use that; otherwise use repos file
+    if args.github_org and args.github_repo:
+        subs = [f"repo:{args.github_org}/{args.github_repo}:ref:refs/heads/*"]
+    elif args.repos_file:
+        subs = get_subs_from_repos(args.repos_file)
+    else:
+        # Default fallback to allowed_repos.txt if neither is specified
+        subs = get_subs_from_repos("allowed_repos.txt")
+    trust_policy = build_trust_policy(subs)
     with open(args.output, "w") as f:
         json.dump(trust_policy, f, indent=2)
     print(f"Generated trust policy for {len(subs)} repos in {args.output}")
@@ -0,0 +1,284 @@
+"""
+permission_index.py: Inverted index from IAM action/resource patterns to roles and policies
+User Story: US-180 (see docs/user_stories.md)
+
+Parses policy JSON files and rendered IAM role templates into a snapshot of
+(role, policy, effect, action, resource) grants. Queries ("which roles can
+s3:PutObject on bucket X?") look up exact actions in a dict and wildcard actions
+only within the action's service, and two snapshots can be diffed to review a
+policy change's blast radius before deploy.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+try:
+    from src.render_iam_template import load_cfn_yaml
+    from src.simulate_trust_policy import wildcard_to_regex
+except ImportError:  # executed as a script from src/
+    from render_iam_template import load_cfn_yaml
+    from simulate_trust_policy import wildcard_to_regex
+
+DEFAULT_INDEX_PATH = "cloudformation/generated/permission_index.json"
+DEFAULT_TEMPLATE_GLOB = "cloudformation/generated/**/*.yaml"
+UNATTACHED_ROLE = "(policy file)"
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def grants_from_document(document, role, policy, source):
+    """
+    Flattens a policy document into grant dicts, one per (statement, action, resource).
+    NotAction/NotResource lists stay together as one "!a,b" pattern, since they
+    only match values outside the whole set.
+    """
+    grants = []
+    for stmt in _as_list(document.get("Statement")):
+        if "NotAction" in stmt:
+            actions = ["!" + ",".join(_as_list(stmt["NotAction"]))]
+        else:
+            actions = _as_list(stmt.get("Action"))
+        if "NotResource" in stmt:
+            resources = ["!" + ",".join(_as_list(stmt["NotResource"]))]
+        else:
+            resources = _as_list(stmt.get("Resource")) or ["*"]
+        for action in actions:
+            for resource in resources:
+                grants.append({
+                    "role": role,
+                    "policy": policy,
+                    "source": source,
+                    "effect": stmt.get("Effect", "Allow"),
+                    "action": action,
+                    "resource": resource,
+                    "conditional": "Condition" in stmt,
+                })
+    return grants
+
+
+def grants_from_template(template_path):
+    """
+    Returns the grants of every policy attached to the IAM role in a rendered template.
+    """
+    data = load_cfn_yaml(Path(template_path).read_text()) or {}
+    grants = []
+    for logical_id, resource in (data.get("Resources") or {}).items():
+        if resource.get("Type") != "AWS::IAM::Role":
+            continue
+        props = resource.get("Properties", {})
+        role = props.get("RoleName") or logical_id
+        for policy in props.get("Policies") or []:
+            grants.extend(grants_from_document(policy.get("PolicyDocument") or {}, role,
+                                               policy.get("PolicyName", "?"), str(template_path)))
+    return grants
+
+
+def build_snapshot(policies_dirs=(), policy_files=(), templates=()):
+    """
+    Builds an index snapshot (a JSON-serializable dict) from policy files and rendered templates.
+    Policy files not tied to a template are indexed under the role "(policy file)".
+    """
+    grants = []
+    for policies_dir in policies_dirs:
+        for path in sorted(Path(policies_dir).glob("*.json")):
+            if path.name.endswith("-example.json"):
+                continue
+            grants.extend(grants_from_document(json.loads(path.read_text()), UNATTACHED_ROLE, path.name, str(path)))
+    for path in policy_files:
+        grants.extend(grants_from_document(json.loads(Path(path).read_text()), UNATTACHED_ROLE,
+                                           "CustomPolicy", str(path)))
+    for path in templates:
+        grants.extend(grants_from_template(path))
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "grants": grants}
+
+
+class PermissionIndex:
+    """
+    Inverted index over a snapshot's grants, keyed by lowercased action.
+    Exact actions are a dict lookup; wildcard actions are only scanned within
+    their service prefix (plus the few that wildcard the service itself).
+    """
+
+    def __init__(self, snapshot):
+        self.grants = snapshot["grants"]
+        self.exact = {}
+        self.wildcard = {}
+        self.other = []
+        for i, grant in enumerate(self.grants):
+            action = grant["action"].lower()
+            if action.startswith("!"):
+                self.other.append((i, [wildcard_to_regex(a, ignore_case=True) for a in action[1:].split(",")]))
+                continue
+            if "*" not in action and "?" not in action:
+                self.exact.setdefault(action, []).append(i)
+                continue
+            service = action.partition(":")[0]
+            regex = wildcard_to_regex(action, ignore_case=True)
+            if "*" in service or "?" in service:
+                self.other.append((i, [regex]))
+            else:
+                self.wildcard.setdefault(service, []).append((i, regex))
+        self._resource_regex = {}
+
+    def _regex(self, pattern):
+        regex = self._resource_regex.get(pattern)
+        if regex is None:
+            regex = self._resource_regex[pattern] = wildcard_to_regex(pattern)
+        return regex
+
+    def _overlaps(self, part, resource, resource_regex):
+        return bool(self._regex(part).fullmatch(resource) or resource_regex.fullmatch(part))
+
+    def _resource_matches(self, pattern, resource, resource_regex):
+        """
+        Returns True if the grant's resource pattern overlaps the queried resource.
+        A NotResource pattern overlaps unless one excluded part covers the whole query.
+        """
+        if pattern.startswith("!"):
+            return not any(self._regex(part).fullmatch(resource) for part in pattern[1:].split(","))
+        return self._overlaps(pattern, resource, resource_regex)
+
+    def _resource_covers(self, pattern, resource, resource_regex):
+        """
+        Returns True if the grant's resource pattern covers every resource the query names.
+        A NotResource pattern only covers the query if none of its parts can overlap it.
+        """
+        if pattern.startswith("!"):
+            return not any(self._overlaps(part, resource, resource_regex) for part in pattern[1:].split(","))
+        return bool(self._regex(pattern).fullmatch(resource))
+
+    def query(self, action, resource=None):
+        """
+        Returns the grants whose action (and resource, if given) covers the query.
+        A wildcard query resource matches grants whose pattern overlaps it either way.
+        """
+        action = action.lower()
+        service = action.partition(":")[0]
+        candidates = list(self.exact.get(action, []))
+        candidates.extend(i for i, regex in self.wildcard.get(service, ()) if regex.fullmatch(action))
+        for i, regexes in self.other:
+            negated = self.grants[i]["action"].startswith("!")
+            if any(regex.fullmatch(action) for regex in regexes) != negated:
+                candidates.append(i)
+        results = [self.grants[i] for i in sorted(candidates)]
+        if resource is not None:
+            resource_regex = wildcard_to_regex(resource)
+            results = [g for g in results if self._resource_matches(g["resource"], resource, resource_regex)]
+        return results
+
+    def effective_roles(self, action, resource=None):
+        """
+        Returns {role: [allowing grants]} for roles with a matching Allow.
+        Allows match by overlap, but an unconditional Deny only removes a role when
+        its resource pattern covers the whole queried resource; without a resource,
+        or for a query broader than the Deny, the role may still act elsewhere.
+        """
+        resource_regex = wildcard_to_regex(resource) if resource is not None else None
+        allowed, denied = {}, set()
+        for grant in self.query(action, resource):
+            if grant["effect"] != "Deny":
+                allowed.setdefault(grant["role"], []).append(grant)
+            elif (not grant["conditional"] and resource is not None
+                  and self._resource_covers(grant["resource"], resource, resource_regex)):
+                denied.add(grant["role"])
+        return {role: grants for role, grants in allowed.items() if role not in denied}
+
+
+def _grant_key(grant):
+    return (grant["role"], grant["policy"], grant["effect"], grant["action"], grant["resource"], grant["conditional"])
+
+
+def diff_snapshots(old, new):
+    """
+    Returns {"added": [...], "removed": [...]} grants between two snapshots.
+    """
+    old_keys = {_grant_key(g): g for g in old["grants"]}
+    new_keys = {_grant_key(g): g for g in new["grants"]}
+    return {
+        "added": [new_keys[k] for k in sorted(new_keys.keys() - old_keys.keys())],
+        "removed": [old_keys[k] for k in sorted(old_keys.keys() - new_keys.keys())],
+    }
+
+
+def _format_grant(grant):
+    flag = " (conditional)" if grant["conditional"] else ""
+    return f"{grant['role']} [{grant['policy']}] {grant['effect']} {grant['action']} on {grant['resource']}{flag}"
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index, query and diff effective IAM permissions across roles")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index snapshot")
+    build.add_argument("--policies-dir", action="append", help="Also index the policy JSON files in this directory, under the role \"(policy file)\" (repeatable)")
+    build.add_argument("--policy-file", action="append", default=[], help="Custom policy JSON file (repeatable)")
+    build.add_argument("--template", action="append", help=f"Rendered template (repeatable, default: {DEFAULT_TEMPLATE_GLOB})")
+    build.add_argument("--output", default=DEFAULT_INDEX_PATH, help=f"Snapshot path (default: {DEFAULT_INDEX_PATH})")
+    query = sub.add_parser("query", help="Which roles can perform an action (on a resource)?")
+    query.add_argument("--index", default=DEFAULT_INDEX_PATH, help="Snapshot to query")
+    query.add_argument("--action", required=True, help="IAM action, e.g. s3:PutObject")
+    query.add_argument("--resource", help="Resource ARN or pattern, e.g. arn:aws:s3:::my-bucket/*")
+    query.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    diff = sub.add_parser("diff", help="Show grants added/removed between two snapshots")
+    diff.add_argument("old", help="Older snapshot")
+    diff.add_argument("new", help="Newer snapshot")
+    diff.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        # Rendered templates already contain policies/, so only index policy files when asked;
+        # indexing both would report every policy under an extra "(policy file)" role
+        policies_dirs = args.policies_dir or []
+        templates = args.template or sorted(Path().glob(DEFAULT_TEMPLATE_GLOB))
+        if not (policies_dirs or args.policy_file or templates):
+            print(f"Error: No templates match {DEFAULT_TEMPLATE_GLOB}; render them first or pass "
+                  "--template, --policies-dir or --policy-file", file=sys.stderr)
+            sys.exit(1)
+        snapshot = build_snapshot(policies_dirs, args.policy_file, templates)
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(snapshot, f, indent=2)
+        roles = {g["role"] for g in snapshot["grants"]}
+        print(f"Indexed {len(snapshot['grants'])} grants across {len(roles)} roles in {args.output}")
+    elif args.command == "query":
+        index = PermissionIndex(_load(args.index))
+        start = time.perf_counter()
+        roles = index.effective_roles(args.action, args.resource)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(roles, indent=2))
+            return
+        target = f" on {args.resource}" if args.resource else ""
+        print(f"{len(roles)} role(s) can {args.action}{target} ({elapsed_ms:.2f} ms)")
+        for role, grants in sorted(roles.items()):
+            print(f"  {role}")
+            for grant in grants:
+                print(f"    {grant['policy']}: {grant['action']} on {grant['resource']}"
+                      f"{' (conditional)' if grant['conditional'] else ''}")
+    else:
+        result = diff_snapshots(_load(args.old), _load(args.new))
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return
+        for grant in result["added"]:
+            print(f"+ {_format_grant(grant)}")
+        for grant in result["removed"]:
+            print(f"- {_format_grant(grant)}")
+        roles = {g["role"] for g in result["added"] + result["removed"]}
+        print(f"{len(result['added'])} added, {len(result['removed'])} removed across {len(roles)} role(s)")
+        if result["added"] or result["removed"]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,57 @@ def to_nice_yaml_block(value, indent=12):
     pad = ' ' * indent
     return ''.join(pad + line if line.strip() else line for line in yaml_str.splitlines(keepends=True))
 
+def _ignore_unknown(loader, tag_suffix, node):
+    # Return node as a string for CloudFormation tags (like !GetAtt)
+    return loader.construct_scalar(node)
+
+class CfnTemplateLoader(yaml.SafeLoader):
+    """
+    SafeLoader that accepts CloudFormation short-form tags in rendered templates.
+    """
+
+CfnTemplateLoader.add_multi_constructor('!', _ignore_unknown)
+
+def load_cfn_yaml(text):
+    """
+    Parses rendered CloudFormation YAML, keeping intrinsic function tags as plain strings.
+    """
+    return yaml.load(text, Loader=CfnTemplateLoader)
+
+def load_policy_files(policies_dir):
+    """
+    Loads every non-example .json policy in policies_dir as {'name', 'document'} dicts.
+    """
+    policies = []
+    for policy_file in os.listdir(policies_dir):
+        # Skip example files and non-JSON files
+        if policy_file.endswith('.json') and not policy_file.endswith('-example.json'):
+            with open(os.path.join(policies_dir, policy_file)) as pf:
+                policy_doc = json.load(pf)
+            policies.append({
+                'name': policy_file,
+                'document': policy_doc
+            })
+    return policies
+
+def render_template(trust_policy, policies, owner, repo, template_dir='cloudformation'):
+    """
+    Renders iam_role.template.j2 with the given trust policy and policies and returns the YAML text.
+    """
+    env = Environment(
+        loader=FileSystemLoader(template_dir),
+        trim_blocks=True,
+        lstrip_blocks=True
+    )
+    env.filters['to_nice_yaml_block'] = to_nice_yaml_block
+    template = env.get_template('iam_role.template.j2')
+    return template.render(
+        trust_policy=trust_policy,
+        policies=policies,
+        owner=owner,
+        repo=repo
+    )
+
 def print_github_oidc_instructions(role_arn, owner, repo):
     print("\nTo use this role in your GitHub Actions workflow:\n")
     print("Option 1: Use a GitHub Actions variable (recommended for teams)")
@@ -80,15 +131,7 @@ def main():
         
         # Check if policies directory exists
         if os.path.exists(policies_dir):
-            for policy_file in os.listdir(policies_dir):
-                # Skip example files and non-JSON files
-                if policy_file.endswith('.json') and not policy_file.endswith('-example.json'):
-                    with open(os.path.join(policies_dir, policy_file)) as pf:
-                        policy_doc = json.load(pf)
-                    policies.append({
-                        'name': policy_file,
-                        'document': policy_doc
-                    })
+            policies.extend(load_policy_files(policies_dir))
         else:
             print(f"WARNING: Policies directory {policies_dir} does not exist. No policies will be loaded.", flush=True)
 
@@ -104,21 +147,8 @@ def main():
 
         template_path = os.path.join(os.path.dirname(__file__), '../cloudformation/iam_role.template.j2')
         print(f"DEBUG: Loading template from {template_path}", flush=True)
-        env = Environment(
-            loader=FileSystemLoader('cloudformation'),
-            trim_blocks=True,
-            lstrip_blocks=True
-        )
-        env.filters['to_nice_yaml_block'] = to_nice_yaml_block
-        template = env.get_template('iam_role.template.j2')
-
         print("DEBUG: Rendering template and writing to output...", flush=True)
-        rendered = template.render(
-            trust_policy=trust_policy,
-            policies=policies,
-            owner=args.owner,
-            repo=args.repo
-        )
+        rendered = render_template(trust_policy, policies, args.owner, args.repo)
 
         # Write to specified output file
         os.makedirs(os.path.dirname(args.output), exist_ok=True)
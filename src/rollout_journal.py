@@ -0,0 +1,129 @@
+"""
+rollout_journal.py: Append-only journal of per-repo and per-stack rollout outcomes
+User Story: US-150 (see docs/user_stories.md)
+
+Every outcome is appended as one JSON line while the rollout runs, so a run that
+dies halfway (Ctrl-C, expired credentials, rate limits) can be resumed with
+--resume and only retries the items that never succeeded.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+DEFAULT_JOURNAL_PATH = "rollout_journal.jsonl"
+
+STATUS_STARTED = "started"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+
+
+def fingerprint(*parts):
+    """
+    Returns a short, stable hash of the given values.
+    Used to tell whether a journaled success still applies (e.g. same variable value, same template).
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def append_entry(journal_path, kind, key, status, fingerprint=None, detail=None):
+    """
+    Appends one outcome to the journal.
+    Args:
+        journal_path (str): Path to the JSONL journal file.
+        kind (str): Item type, e.g. "repo" or "stack".
+        key (str): Item identifier, e.g. "org/repo:VAR" or a stack name.
+        status (str): One of STATUS_STARTED, STATUS_SUCCEEDED, STATUS_FAILED.
+        fingerprint (str, optional): Hash of the desired state for this item.
+        detail (str, optional): Free-form error or status message.
+    The line is written with a single write() under an exclusive flock, so
+    concurrent workers never interleave partial lines.
+    """
+    entry = {
+        "ts": time.time(),
+        "pid": os.getpid(),
+        "kind": kind,
+        "key": key,
+        "status": status,
+    }
+    if fingerprint is not None:
+        entry["fingerprint"] = fingerprint
+    if detail is not None:
+        entry["detail"] = detail
+    line = (json.dumps(entry, sort_keys=True) + "\n").encode()
+    path = Path(journal_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            os.write(fd, line)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def load_latest(journal_path):
+    """
+    Returns the latest journal entry for every (kind, key) pair.
+    Lines that cannot be parsed (e.g. a write cut short by a crash) are skipped.
+    """
+    latest = {}
+    path = Path(journal_path)
+    if not path.exists():
+        return latest
+    with path.open() as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+        try:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                latest[(entry.get("kind"), entry.get("key"))] = entry
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    return latest
+
+
+def is_done(latest, kind, key, fingerprint=None):
+    """
+    Returns True if the item's latest outcome is a success for the same fingerprint.
+    """
+    entry = latest.get((kind, key))
+    if not entry or entry.get("status") != STATUS_SUCCEEDED:
+        return False
+    return fingerprint is None or entry.get("fingerprint") == fingerprint
+
+
+def pending_keys(journal_path, kind, keys, fingerprint=None):
+    """
+    Filters keys down to the ones that are still pending or failed in the journal.
+    """
+    latest = load_latest(journal_path)
+    return [key for key in keys if not is_done(latest, kind, key, fingerprint)]
+
+
+def summarize(journal_path):
+    """
+    Returns a {kind: {status: count}} summary of the latest outcome per item.
+    """
+    summary = {}
+    for (kind, _key), entry in load_latest(journal_path).items():
+        counts = summary.setdefault(kind, {})
+        counts[entry.get("status")] = counts.get(entry.get("status"), 0) + 1
+    return summary
+
+
+if __name__ == "__main__":
+    journal = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_JOURNAL_PATH
+    for kind, counts in sorted(summarize(journal).items()):
+        print(f"{kind}: " + ", ".join(f"{status}={count}" for status, count in sorted(counts.items())))
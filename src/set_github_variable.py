@@ -7,6 +7,12 @@ import sys
 from pathlib import Path
 import argparse
 
+try:
+    from src import rollout_journal, state_store
+except ImportError:  # executed as a script from src/
+    import rollout_journal
+    import state_store
+
 GITHUB_API = "https://api.github.com"
 
 
@@ -36,6 +42,40 @@ def set_repo_variable(org, repo, var_name, var_value, github_token):
         return False
 
 
+def set_repo_variables(targets, var_name, var_value, github_token, journal_path=None, resume=False, state_db=None):
+    """
+    Sets the variable for each (org, repo) target, journaling every outcome.
+    Args:
+        targets (list): (org, repo) tuples to update.
+        journal_path (str, optional): Rollout journal to append outcomes to.
+        resume (bool): Skip targets the journal already records as succeeded with the same value.
+        state_db (str, optional): Local state database to record successful syncs in.
+    Returns:
+        list: (org, repo) tuples that failed.
+    """
+    value_fp = rollout_journal.fingerprint(var_name, var_value)
+    if resume and journal_path:
+        by_key = {f"{org}/{repo}:{var_name}": (org, repo) for org, repo in targets}
+        remaining = [by_key[key] for key in rollout_journal.pending_keys(journal_path, "repo", list(by_key), value_fp)]
+        print(f"Resuming: {len(targets) - len(remaining)} of {len(targets)} repos already done, {len(remaining)} pending.")
+        targets = remaining
+    conn = state_store.connect(state_db) if state_db else None
+    failed = []
+    for org, repo in targets:
+        key = f"{org}/{repo}:{var_name}"
+        if journal_path:
+            rollout_journal.append_entry(journal_path, "repo", key, rollout_journal.STATUS_STARTED, value_fp)
+        ok = set_repo_variable(org, repo, var_name, var_value, github_token)
+        if journal_path:
+            status = rollout_journal.STATUS_SUCCEEDED if ok else rollout_journal.STATUS_FAILED
+            rollout_journal.append_entry(journal_path, "repo", key, status, value_fp)
+        if ok and conn is not None:
+            state_store.record_variable_sync(conn, f"{org}/{repo}", var_name, var_value)
+        if not ok:
+            failed.append((org, repo))
+    return failed
+
+
 def main():
     parser = argparse.ArgumentParser(description="Set a GitHub Actions repo variable for repos from file or individual repo")
     parser.add_argument("--github-org", required=True, help="GitHub organization name")
@@ -44,26 +84,46 @@ def main():
     parser.add_argument("--var-name", required=True, help="Variable name to set")
     parser.add_argument("--var-value", required=True, help="Variable value to set")
     parser.add_argument("--repos-file", help="File listing repos (one per line)")
+    parser.add_argument("--journal", help=f"Append per-repo outcomes to this rollout journal (default with --resume: {rollout_journal.DEFAULT_JOURNAL_PATH})")
+    parser.add_argument("--resume", action="store_true", help="Only retry repos that are pending or failed in the journal")
+    parser.add_argument("--state-db", default=state_store.DEFAULT_DB_PATH, help=f"Local state database to record synced values in (default: {state_store.DEFAULT_DB_PATH})")
     args = parser.parse_args()
+    journal_path = args.journal or (rollout_journal.DEFAULT_JOURNAL_PATH if args.resume else None)
 
     # If individual repo is specified, use that; otherwise use repos file
     if args.github_repo:
-        set_repo_variable(args.github_org, args.github_repo, args.var_name, args.var_value, args.github_token)
+        targets = [(args.github_org, args.github_repo)]
     elif args.repos_file:
         repos_path = Path(args.repos_file)
         if not repos_path.exists():
             print(f"Repos file not found: {repos_path}", file=sys.stderr)
             sys.exit(1)
         repos = [line.strip() for line in repos_path.read_text().splitlines() if line.strip() and not line.startswith("#")]
+        targets = []
         for repo in repos:
             if "/" in repo:
                 org, repo_name = repo.split("/", 1)
             else:
                 org, repo_name = args.github_org, repo
-            set_repo_variable(org, repo_name, args.var_name, args.var_value, args.github_token)
+            targets.append((org, repo_name))
     else:
         print("Error: Either --github-repo or --repos-file must be specified", file=sys.stderr)
         sys.exit(1)
 
+    resume_hint = f"Re-run with --resume --journal {journal_path} to retry pending repos."
+    try:
+        failed = set_repo_variables(targets, args.var_name, args.var_value, args.github_token,
+                                    journal_path=journal_path, resume=args.resume, state_db=args.state_db)
+    except KeyboardInterrupt:
+        if journal_path:
+            print(f"\nInterrupted. {resume_hint}", file=sys.stderr)
+        sys.exit(130)
+    if failed:
+        print(f"❌ Failed to set '{args.var_name}' for {len(failed)} repo(s): "
+              f"{', '.join(f'{org}/{repo}' for org, repo in failed)}", file=sys.stderr)
+        if journal_path:
+            print(resume_hint, file=sys.stderr)
+        sys.exit(1)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,280 @@
+"""
+simulate_trust_policy.py: Evaluate GitHub OIDC `sub` claims against a trust policy locally
+User Story: US-150 (see docs/user_stories.md)
+
+The StringLike/StringEquals conditions on token.actions.githubusercontent.com:sub are
+compiled into a matcher that buckets patterns by their literal `repo:owner/name:`
+prefix, so each claim is only tested against the few patterns for its repository.
+Results are memoized per distinct claim, which makes large logged batches cheap.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+SUB_KEY = "token.actions.githubusercontent.com:sub"
+DEFAULT_TRUST_POLICY = "cloudformation/generated/trust_policy.json"
+# Distinct claims memoized per simulator; bounded so huge synthetic batches stay in memory
+CACHE_LIMIT = 200_000
+
+
+def wildcard_to_regex(pattern, ignore_case=False):
+    """
+    Compiles an IAM wildcard pattern ('*' = any run of characters, '?' = one character).
+    """
+    regex = "".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in pattern)
+    return re.compile(regex, re.DOTALL | (re.IGNORECASE if ignore_case else 0))
+
+
+def _bucket_key(value):
+    """
+    Returns the 'repo:owner/name:' prefix of a subject, or None if it has none.
+    """
+    parts = value.split(":", 2)
+    if len(parts) < 3 or parts[0] != "repo":
+        return None
+    return f"{parts[0]}:{parts[1]}:"
+
+
+def claim_kind(sub):
+    """
+    Classifies a subject as branch, tag, environment, pull_request or other.
+    """
+    rest = sub.split(":", 2)[2] if sub.count(":") >= 2 else ""
+    if rest.startswith("ref:refs/heads/"):
+        return "branch"
+    if rest.startswith("ref:refs/tags/"):
+        return "tag"
+    if rest.startswith("environment:"):
+        return "environment"
+    if rest == "pull_request":
+        return "pull_request"
+    return "other"
+
+
+class SubjectMatcher:
+    """
+    Matches subjects against a set of StringLike (wildcard) or StringEquals (exact) patterns.
+    """
+
+    def __init__(self, patterns, wildcard=True):
+        self.patterns = list(patterns)
+        self.exact = {}
+        self.buckets = {}
+        self.unbucketed = []
+        for index, pattern in enumerate(self.patterns):
+            if not wildcard or ("*" not in pattern and "?" not in pattern):
+                self.exact.setdefault(pattern, index)
+                continue
+            compiled = (index, wildcard_to_regex(pattern))
+            key = _bucket_key(pattern)
+            if key and "*" not in key and "?" not in key:
+                self.buckets.setdefault(key, []).append(compiled)
+            else:
+                self.unbucketed.append(compiled)
+
+    def matches(self, sub):
+        """
+        Returns the indexes of every pattern that matches the subject.
+        """
+        hits = []
+        index = self.exact.get(sub)
+        if index is not None:
+            hits.append(index)
+        for index, regex in self.buckets.get(_bucket_key(sub), ()):
+            if regex.fullmatch(sub):
+                hits.append(index)
+        for index, regex in self.unbucketed:
+            if regex.fullmatch(sub):
+                hits.append(index)
+        return hits
+
+
+class TrustPolicySimulator:
+    """
+    Compiled view of the AssumeRoleWithWebIdentity statements in a trust policy.
+    A claim is accepted if any Allow statement's sub conditions all match.
+    """
+
+    def __init__(self, trust_policy):
+        self.statements = []
+        self.patterns = []
+        statements = trust_policy.get("Statement", [])
+        for stmt in statements if isinstance(statements, list) else [statements]:
+            actions = stmt.get("Action", [])
+            actions = actions if isinstance(actions, list) else [actions]
+            if stmt.get("Effect") != "Allow" or "sts:AssumeRoleWithWebIdentity" not in actions:
+                continue
+            matchers = []
+            for operator, wildcard in (("StringLike", True), ("StringEquals", False)):
+                values = stmt.get("Condition", {}).get(operator, {}).get(SUB_KEY)
+                if values is None:
+                    continue
+                values = values if isinstance(values, list) else [values]
+                offset = len(self.patterns)
+                self.patterns.extend(values)
+                matchers.append((offset, SubjectMatcher(values, wildcard)))
+            self.statements.append(matchers)
+        self._cache = {}
+
+    def evaluate(self, sub):
+        """
+        Returns (accepted, matched pattern indexes) for one subject claim.
+        """
+        cached = self._cache.get(sub)
+        if cached is not None:
+            return cached
+        accepted = False
+        hits = []
+        for matchers in self.statements:
+            statement_hits = []
+            for offset, matcher in matchers:
+                matched = matcher.matches(sub)
+                if not matched:
+                    statement_hits = None
+                    break
+                statement_hits.extend(offset + i for i in matched)
+            if statement_hits is not None:
+                accepted = True
+                hits.extend(statement_hits)
+        result = (accepted, tuple(hits))
+        if len(self._cache) < CACHE_LIMIT:
+            self._cache[sub] = result
+        return result
+
+    def simulate(self, claims, max_denied_samples=20):
+        """
+        Evaluates a batch of subject claims and returns a report dict.
+        """
+        start = time.perf_counter()
+        total = accepted = 0
+        by_kind = {}
+        denied_samples = []
+        pattern_hits = [0] * len(self.patterns)
+        for sub in claims:
+            total += 1
+            ok, hits = self.evaluate(sub)
+            kind = claim_kind(sub)
+            counts = by_kind.setdefault(kind, {"accepted": 0, "denied": 0})
+            if ok:
+                accepted += 1
+                counts["accepted"] += 1
+                for i in hits:
+                    pattern_hits[i] += 1
+            else:
+                counts["denied"] += 1
+                if len(denied_samples) < max_denied_samples:
+                    denied_samples.append(sub)
+        elapsed = time.perf_counter() - start
+        return {
+            "claims": total,
+            "accepted": accepted,
+            "denied": total - accepted,
+            "by_kind": by_kind,
+            "denied_samples": denied_samples,
+            "unreachable_patterns": [p for p, n in zip(self.patterns, pattern_hits) if n == 0],
+            # GitHub subjects always start with "repo:", so anything else can never match
+            "malformed_patterns": [p for p in self.patterns if not p.startswith("repo:") and p[:1] not in ("*", "?")],
+            "claims_per_second": int(total / elapsed) if elapsed > 0 else total,
+        }
+
+
+def synthetic_claims(repos, branches=("main",), tags=("v1.0.0",), environments=("production",), pull_request=True):
+    """
+    Yields one subject per repo and branch, tag, environment and (optionally) pull_request.
+    """
+    for repo in repos:
+        for branch in branches:
+            yield f"repo:{repo}:ref:refs/heads/{branch}"
+        for tag in tags:
+            yield f"repo:{repo}:ref:refs/tags/{tag}"
+        for env in environments:
+            yield f"repo:{repo}:environment:{env}"
+        if pull_request:
+            yield f"repo:{repo}:pull_request"
+
+
+def read_claims(path):
+    """
+    Yields subjects from a file of plain `sub` lines or JSON lines with a "sub" field ('-' for stdin).
+    """
+    f = sys.stdin if path == "-" else open(path)
+    try:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                sub = json.loads(line).get("sub")
+                if sub:
+                    yield sub
+            else:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _read_repos(repos_file):
+    return [line.strip() for line in Path(repos_file).read_text().splitlines()
+            if line.strip() and not line.startswith("#")]
+
+
+def _print_report(report):
+    print(f"Claims: {report['claims']}  accepted: {report['accepted']}  denied: {report['denied']}  "
+          f"({report['claims_per_second']:,} claims/s)")
+    for kind, counts in sorted(report["by_kind"].items()):
+        print(f"  {kind}: accepted={counts['accepted']} denied={counts['denied']}")
+    if report["denied_samples"]:
+        print("❌ Denied (sample):")
+        for sub in report["denied_samples"]:
+            print(f"  {sub}")
+    if report["unreachable_patterns"]:
+        print("⚠️  Trust policy subjects no claim reached:")
+        for pattern in report["unreachable_patterns"]:
+            print(f"  {pattern}")
+    if report["malformed_patterns"]:
+        print("⚠️  Trust policy subjects that no GitHub token can have:")
+        for pattern in report["malformed_patterns"]:
+            print(f"  {pattern}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate GitHub OIDC sub claims against a trust policy")
+    parser.add_argument("--trust-policy", default=DEFAULT_TRUST_POLICY, help=f"Trust policy JSON (default: {DEFAULT_TRUST_POLICY})")
+    parser.add_argument("--claims-file", action="append", default=[], help="File of sub claims, plain or JSON lines ('-' for stdin, repeatable)")
+    parser.add_argument("--repos-file", help="Generate synthetic claims for every repo in this file")
+    parser.add_argument("--branch", action="append", help="Branch for synthetic claims (default: main, repeatable)")
+    parser.add_argument("--tag", action="append", help="Tag for synthetic claims (default: v1.0.0, repeatable)")
+    parser.add_argument("--environment", action="append", help="Environment for synthetic claims (default: production, repeatable)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--fail-on-denied", action="store_true", help="Exit 1 if any claim is denied")
+    parser.add_argument("--fail-on-unreachable", action="store_true", help="Exit 1 if any trust policy subject is unreachable")
+    args = parser.parse_args()
+
+    if not args.claims_file and not args.repos_file:
+        print("Error: Either --claims-file or --repos-file must be specified", file=sys.stderr)
+        sys.exit(1)
+    with open(args.trust_policy) as f:
+        simulator = TrustPolicySimulator(json.load(f))
+
+    def claims():
+        for path in args.claims_file:
+            yield from read_claims(path)
+        if args.repos_file:
+            yield from synthetic_claims(_read_repos(args.repos_file), args.branch or ("main",),
+                                        args.tag or ("v1.0.0",), args.environment or ("production",))
+
+    report = simulator.simulate(claims())
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    if (args.fail_on_denied and report["denied"]) or (args.fail_on_unreachable and report["unreachable_patterns"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+stack_events.py: Incremental CloudFormation stack event streaming
+User Story: US-100 (see docs/user_stories.md)
+
+describe_stack_events returns events newest-first, so each stack keeps a cursor
+(the newest EventId already seen) and a poll only pages back until it reaches it.
+"""
+import sys
+import time
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+DEFAULT_POLL_INTERVAL = 5
+
+
+def is_failure_event(event):
+    """
+    Returns True for resource events such as CREATE_FAILED or UPDATE_FAILED.
+    """
+    return event.get("ResourceStatus", "").endswith("_FAILED")
+
+
+def format_event(stack_name, event):
+    ts = event["Timestamp"].strftime("%H:%M:%S") if hasattr(event.get("Timestamp"), "strftime") else ""
+    line = f"[{stack_name}] {ts} {event.get('LogicalResourceId', '')} {event.get('ResourceStatus', '')}"
+    if event.get("ResourceStatusReason"):
+        line += f" - {event['ResourceStatusReason']}"
+    return line
+
+
+class StackEventCursor:
+    """
+    Tracks the newest event seen for one stack so each poll only fetches new events.
+    Events older than 'since' are ignored, so an existing stack's history is not replayed.
+    """
+
+    def __init__(self, cloudformation, stack_name, since=None):
+        self.cloudformation = cloudformation
+        self.stack_name = stack_name
+        self.since = since or datetime.now(timezone.utc)
+        self.last_event_id = None
+
+    def poll(self):
+        """
+        Returns new events in chronological order (empty if the stack does not exist yet).
+        """
+        new_events = []
+        kwargs = {"StackName": self.stack_name}
+        try:
+            while True:
+                page = self.cloudformation.describe_stack_events(**kwargs)
+                reached_cursor = False
+                for event in page.get("StackEvents", []):
+                    if event["EventId"] == self.last_event_id or event["Timestamp"] < self.since:
+                        reached_cursor = True
+                        break
+                    new_events.append(event)
+                if reached_cursor or not page.get("NextToken"):
+                    break
+                kwargs["NextToken"] = page["NextToken"]
+        except ClientError as e:
+            if "does not exist" in str(e):
+                return []
+            raise
+        if new_events:
+            self.last_event_id = new_events[0]["EventId"]
+        return list(reversed(new_events))
+
+
+def follow_stacks(cloudformation, stack_names, is_running, on_failure=None,
+                  poll_interval=DEFAULT_POLL_INTERVAL, out=sys.stdout, since=None):
+    """
+    Multiplexes the event streams of several stacks until is_running(stack_name) is False for all.
+    Args:
+        cloudformation: boto3 CloudFormation client.
+        stack_names (list): Stacks to follow.
+        is_running (callable): stack_name -> bool, whether the deploy is still in progress.
+        on_failure (callable, optional): Called once per stack with (stack_name, event)
+            as soon as its first failed resource event appears.
+        poll_interval (float): Seconds between polling rounds.
+    Returns:
+        dict: stack_name -> first failed event, or None.
+    """
+    cursors = {name: StackEventCursor(cloudformation, name, since) for name in stack_names}
+    first_failure = {name: None for name in stack_names}
+
+    def drain(name):
+        for event in cursors[name].poll():
+            print(format_event(name, event), file=out, flush=True)
+            if is_failure_event(event) and first_failure[name] is None:
+                first_failure[name] = event
+                print(f"❌ [{name}] First failure: {event.get('LogicalResourceId')} "
+                      f"{event.get('ResourceStatus')} - {event.get('ResourceStatusReason', '')}", file=out, flush=True)
+                if on_failure:
+                    on_failure(name, event)
+
+    active = list(stack_names)
+    while active:
+        for name in list(active):
+            running = is_running(name)
+            drain(name)
+            if not running:
+                active.remove(name)
+        if active:
+            time.sleep(poll_interval)
+    return first_failure
+
+
+def cancel_update(cloudformation, stack_name):
+    """
+    Requests cancellation of an in-progress stack update. Returns True if accepted.
+    Stack creations cannot be cancelled; a failed create rolls back on its own.
+    """
+    try:
+        cloudformation.cancel_update_stack(StackName=stack_name)
+        print(f"Requested cancel of update for stack {stack_name}", flush=True)
+        return True
+    except ClientError as e:
+        print(f"Could not cancel update for stack {stack_name}: {e}", file=sys.stderr, flush=True)
+        return False
@@ -0,0 +1,269 @@
+"""
+state_store.py: Local SQLite state of deployed stacks, role ARNs and synced repo variables
+User Story: US-180 (see docs/user_stories.md)
+
+cfn_deploy.py records every deploy and set_github_variable.py every variable sync,
+so fleet-wide questions ("which role ARN does repo X use, and is it current?") are
+answered locally instead of with one describe_stacks call per stack.
+"""
+import argparse
+import hashlib
+import json
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    from src import aws_clients
+    from src.render_iam_template import load_cfn_yaml
+except ImportError:  # executed as a script from src/
+    import aws_clients
+    from render_iam_template import load_cfn_yaml
+
+DEFAULT_DB_PATH = "gha_oidc_state.db"
+DEFAULT_STACK_PREFIX = "gha-aws-oidc-"
+DEFAULT_VAR_NAME = "GHA_OIDC_ROLE_ARN"
+TEMPLATE_PATH = Path(__file__).parent.parent / "cloudformation" / "generated" / "iam_role.yaml"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stacks (
+    stack_name    TEXT NOT NULL,
+    region        TEXT NOT NULL,
+    account_id    TEXT,
+    role_arn      TEXT,
+    template_hash TEXT,
+    policy_hash   TEXT,
+    deployed_at   TEXT,
+    refreshed_at  TEXT,
+    PRIMARY KEY (stack_name, region)
+);
+CREATE INDEX IF NOT EXISTS idx_stacks_role_arn ON stacks (role_arn);
+CREATE INDEX IF NOT EXISTS idx_stacks_account_region ON stacks (account_id, region);
+CREATE INDEX IF NOT EXISTS idx_stacks_template_hash ON stacks (template_hash);
+CREATE INDEX IF NOT EXISTS idx_stacks_policy_hash ON stacks (policy_hash);
+
+CREATE TABLE IF NOT EXISTS repo_variables (
+    repo      TEXT NOT NULL,
+    var_name  TEXT NOT NULL,
+    value     TEXT,
+    synced_at TEXT,
+    PRIMARY KEY (repo, var_name)
+);
+CREATE INDEX IF NOT EXISTS idx_repo_variables_value ON repo_variables (var_name, value);
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def connect(db_path=DEFAULT_DB_PATH):
+    """
+    Opens (and creates if needed) the state database.
+    WAL mode and a busy timeout let concurrent deploy and sync workers write safely.
+    """
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def template_hashes(template_path=TEMPLATE_PATH):
+    """
+    Returns (template_hash, policy_hash) for a rendered IAM role template.
+    policy_hash covers only the attached policy documents, so it changes when
+    the policy set changes but not when e.g. the trust policy does.
+    """
+    text = Path(template_path).read_text()
+    data = load_cfn_yaml(text) or {}
+    role = data.get("Resources", {}).get("GitHubActionsOIDCRole", {})
+    policies = role.get("Properties", {}).get("Policies") or []
+    policy_hash = _sha256(json.dumps(sorted(policies, key=lambda p: p.get("PolicyName", "")), sort_keys=True))
+    return _sha256(text), policy_hash
+
+
+def account_from_arn(arn):
+    parts = (arn or "").split(":")
+    return parts[4] if len(parts) > 4 and parts[4] else None
+
+
+def record_stack(conn, stack_name, region, role_arn, template_hash=None, policy_hash=None, deployed=False):
+    """
+    Upserts a stack. Hash columns are only overwritten when provided, and
+    deployed_at only moves when deployed=True (refreshes leave it alone).
+    """
+    now = _now()
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO stacks (stack_name, region, account_id, role_arn, template_hash, policy_hash, deployed_at, refreshed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (stack_name, region) DO UPDATE SET
+                account_id = excluded.account_id,
+                role_arn = excluded.role_arn,
+                template_hash = COALESCE(excluded.template_hash, stacks.template_hash),
+                policy_hash = COALESCE(excluded.policy_hash, stacks.policy_hash),
+                deployed_at = COALESCE(excluded.deployed_at, stacks.deployed_at),
+                refreshed_at = excluded.refreshed_at
+            """,
+            (stack_name, region, account_from_arn(role_arn), role_arn, template_hash, policy_hash,
+             now if deployed else None, now),
+        )
+
+
+def record_variable_sync(conn, repo, var_name, value):
+    """
+    Upserts the last value successfully written to a repo variable.
+    """
+    with conn:
+        conn.execute(
+            """
+            INSERT INTO repo_variables (repo, var_name, value, synced_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (repo, var_name) DO UPDATE SET value = excluded.value, synced_at = excluded.synced_at
+            """,
+            (repo, var_name, value, _now()),
+        )
+
+
+def repo_status(conn, repo, var_name=DEFAULT_VAR_NAME, current_policy_hash=None):
+    """
+    Returns what the store knows about one repo's role, or None if it was never synced.
+    'current' is True when the variable points at a known stack role and, if a
+    policy hash is given, that stack was deployed with the same policy set.
+    """
+    row = conn.execute(
+        """
+        SELECT v.repo, v.value AS role_arn, v.synced_at, s.stack_name, s.region, s.account_id,
+               s.template_hash, s.policy_hash, s.deployed_at
+        FROM repo_variables v LEFT JOIN stacks s ON s.role_arn = v.value
+        WHERE v.repo = ? AND v.var_name = ?
+        """,
+        (repo, var_name),
+    ).fetchone()
+    if row is None:
+        return None
+    status = dict(row)
+    status["current"] = bool(row["stack_name"]) and (
+        current_policy_hash is None or row["policy_hash"] == current_policy_hash
+    )
+    return status
+
+
+def fleet_status(conn, var_name=DEFAULT_VAR_NAME, current_policy_hash=None):
+    """
+    Returns a fleet-wide summary computed with indexed queries.
+    Templates differ per repo (role name, trust policy), so staleness is judged
+    by the shared policy set hash.
+    """
+    summary = {
+        "stacks": conn.execute("SELECT COUNT(*) FROM stacks").fetchone()[0],
+        "by_account_region": [dict(r) for r in conn.execute(
+            "SELECT account_id, region, COUNT(*) AS stacks FROM stacks GROUP BY account_id, region ORDER BY account_id, region"
+        )],
+        "repos": conn.execute("SELECT COUNT(*) FROM repo_variables WHERE var_name = ?", (var_name,)).fetchone()[0],
+        "unknown_role_repos": [r[0] for r in conn.execute(
+            """
+            SELECT v.repo FROM repo_variables v
+            WHERE v.var_name = ? AND NOT EXISTS (SELECT 1 FROM stacks s WHERE s.role_arn = v.value)
+            ORDER BY v.repo
+            """,
+            (var_name,),
+        )],
+        "outdated_stacks": [],
+    }
+    if current_policy_hash:
+        summary["outdated_stacks"] = [f"{r[1]}/{r[0]}" for r in conn.execute(
+            "SELECT stack_name, region FROM stacks WHERE policy_hash IS NOT NULL AND policy_hash != ? ORDER BY region, stack_name",
+            (current_policy_hash,),
+        )]
+    return summary
+
+
+def refresh_from_aws(conn, region, cloudformation=None, prefix=DEFAULT_STACK_PREFIX):
+    """
+    Re-syncs stack role ARNs from AWS using paginated describe_stacks (one call per page
+    of stacks, not one per stack). Rows for stacks in this region and prefix that AWS no
+    longer returns are deleted. Returns (stacks recorded, stacks removed).
+    """
+    if cloudformation is None:
+        cloudformation = aws_clients.client("cloudformation", region)
+    seen = set()
+    for page in cloudformation.get_paginator("describe_stacks").paginate():
+        for stack in page.get("Stacks", []):
+            if not stack["StackName"].startswith(prefix) or stack.get("StackStatus") == "DELETE_COMPLETE":
+                continue
+            outputs = {o["OutputKey"]: o["OutputValue"] for o in stack.get("Outputs", [])}
+            record_stack(conn, stack["StackName"], region, outputs.get("RoleArn"))
+            seen.add(stack["StackName"])
+    gone = [r[0] for r in conn.execute("SELECT stack_name FROM stacks WHERE region = ?", (region,))
+            if r[0].startswith(prefix) and r[0] not in seen]
+    with conn:
+        conn.executemany("DELETE FROM stacks WHERE stack_name = ? AND region = ?", [(name, region) for name in gone])
+    return len(seen), len(gone)
+
+
+def _print_fleet_status(summary):
+    print(f"Stacks: {summary['stacks']}")
+    for row in summary["by_account_region"]:
+        print(f"  {row['account_id'] or 'unknown'} / {row['region']}: {row['stacks']}")
+    print(f"Repos synced: {summary['repos']}")
+    if summary["unknown_role_repos"]:
+        print(f"❌ Repos pointing at an unknown role ARN ({len(summary['unknown_role_repos'])}):")
+        for repo in summary["unknown_role_repos"]:
+            print(f"  {repo}")
+    if summary["outdated_stacks"]:
+        print(f"❌ Stacks not deployed with the current policy set ({len(summary['outdated_stacks'])}):")
+        for stack in summary["outdated_stacks"]:
+            print(f"  {stack}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or refresh the local stack/role state database")
+    parser.add_argument("--state-db", default=DEFAULT_DB_PATH, help=f"State database path (default: {DEFAULT_DB_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    status = sub.add_parser("status", help="Show fleet-wide or per-repo status")
+    status.add_argument("--repo", help="Show status for one repo (org/repo)")
+    status.add_argument("--var-name", default=DEFAULT_VAR_NAME, help="Repo variable holding the role ARN")
+    status.add_argument("--template", default=str(TEMPLATE_PATH), help="Rendered template whose policy set stacks are compared against")
+    status.add_argument("--json", action="store_true", help="Print JSON instead of text")
+    refresh = sub.add_parser("refresh", help="Re-sync stack role ARNs from AWS")
+    refresh.add_argument("--region", action="append", required=True, help="AWS region (repeatable)")
+    refresh.add_argument("--prefix", default=DEFAULT_STACK_PREFIX, help="Only record stacks with this name prefix")
+    args = parser.parse_args()
+
+    conn = connect(args.state_db)
+    if args.command == "refresh":
+        for region in args.region:
+            count, removed = refresh_from_aws(conn, region, prefix=args.prefix)
+            print(f"Refreshed {count} stacks in {region}, removed {removed} no longer in AWS")
+        return
+
+    current_hash = template_hashes(args.template)[1] if Path(args.template).exists() else None
+    if args.repo:
+        result = repo_status(conn, args.repo, args.var_name, current_hash)
+        if result is None:
+            print(f"No sync recorded for {args.repo}", file=sys.stderr)
+            sys.exit(1)
+        if args.json:
+            print(json.dumps(result, indent=2))
+        else:
+            print(f"{'✅' if result['current'] else '❌'} {result['repo']}: {result['role_arn']}")
+            print(f"   stack: {result['stack_name'] or 'unknown'} ({result['region'] or '-'}, account {result['account_id'] or '-'})")
+            print(f"   synced: {result['synced_at']}  deployed: {result['deployed_at'] or '-'}")
+        return
+
+    summary = fleet_status(conn, args.var_name, current_hash)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        _print_fleet_status(summary)
+
+
+if __name__ == "__main__":
+    main()
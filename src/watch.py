@@ -0,0 +1,312 @@
+"""
+watch.py: Re-render the trust policy and IAM template when policies, the repo list or the template change
+User Story: US-110 (see docs/user_stories.md)
+
+Long-running alternative to rerunning `run.sh --render-only` after every edit.
+File events (inotify on Linux, via watchdog) are debounced, then only the affected
+pieces are rebuilt: a repo list change regenerates the trust policy, a policy file
+change reloads just that file, and a template change reloads the Jinja2 template.
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+from jinja2 import TemplateError
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+try:
+    from src import cfn_deploy, generate_trust_policy, render_iam_template
+except ImportError:  # executed as a script from src/
+    import cfn_deploy
+    import generate_trust_policy
+    import render_iam_template
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_DEBOUNCE = 0.5
+CONTENT_EVENTS = {"created", "modified", "moved", "deleted"}
+
+
+def validate_rendered(text):
+    """
+    Runs local (offline) checks on a rendered IAM role template.
+    Returns a list of error strings; empty means valid.
+    """
+    try:
+        data = render_iam_template.load_cfn_yaml(text)
+    except yaml.YAMLError as e:
+        return [f"Invalid YAML: {e}"]
+    if not isinstance(data, dict) or "Resources" not in data:
+        return ["Template has no Resources section"]
+    role = data["Resources"].get("GitHubActionsOIDCRole")
+    if not role or role.get("Type") != "AWS::IAM::Role":
+        return ["GitHubActionsOIDCRole (AWS::IAM::Role) is missing"]
+    props = role.get("Properties", {})
+    errors = []
+    if not props.get("AssumeRolePolicyDocument", {}).get("Statement"):
+        errors.append("AssumeRolePolicyDocument has no statements")
+    for policy in props.get("Policies") or []:
+        name = policy.get("PolicyName", "?")
+        doc = policy.get("PolicyDocument") or {}
+        statements = doc.get("Statement")
+        if not statements:
+            errors.append(f"{name}: PolicyDocument has no statements")
+            continue
+        for i, stmt in enumerate(statements if isinstance(statements, list) else [statements]):
+            if stmt.get("Effect") not in ("Allow", "Deny"):
+                errors.append(f"{name}: statement {i} has invalid Effect {stmt.get('Effect')!r}")
+            if "Action" not in stmt and "NotAction" not in stmt:
+                errors.append(f"{name}: statement {i} has no Action")
+            if "Resource" not in stmt and "NotResource" not in stmt:
+                errors.append(f"{name}: statement {i} has no Resource")
+    return errors
+
+
+class WatchSession:
+    """
+    Holds the last loaded inputs and rendered output so each change only
+    rebuilds what it affects, and unchanged output is never rewritten.
+    """
+
+    def __init__(self, owner, repo, repos_file=None, policies_dir=None, policy_file=None,
+                 template_dir="cloudformation", output="cloudformation/generated/iam_role.yaml",
+                 trust_policy_output="cloudformation/generated/trust_policy.json", on_change=None):
+        self.owner = owner
+        self.repo = repo
+        self.repos_file = Path(repos_file).resolve() if repos_file else None
+        self.policies_dir = Path(policies_dir or PROJECT_ROOT / "policies").resolve()
+        self.policy_file = Path(policy_file).resolve() if policy_file else None
+        self.template_dir = Path(template_dir).resolve()
+        self.template_path = self.template_dir / "iam_role.template.j2"
+        self.output = Path(output)
+        self.trust_policy_output = Path(trust_policy_output)
+        self.on_change = on_change
+        self.trust_policy = None
+        self.policies = {}
+        self.rendered = None
+
+    def watched_dirs(self):
+        dirs = {self.policies_dir, self.template_dir}
+        if self.repos_file:
+            dirs.add(self.repos_file.parent)
+        if self.policy_file:
+            dirs.add(self.policy_file.parent)
+        return sorted(d for d in dirs if d.exists())
+
+    def classify(self, path):
+        """
+        Returns which input a changed path belongs to: 'trust', 'policy', 'template' or None.
+        """
+        path = Path(path).resolve()
+        if self.repos_file and path == self.repos_file:
+            return "trust"
+        if path == self.template_path:
+            return "template"
+        if self.policy_file and path == self.policy_file:
+            return "policy"
+        if (path.parent == self.policies_dir and path.suffix == ".json"
+                and not path.name.endswith("-example.json")):
+            return "policy"
+        return None
+
+    def _load_trust_policy(self):
+        if self.repos_file:
+            subs = generate_trust_policy.get_subs_from_repos(str(self.repos_file))
+        else:
+            subs = [f"repo:{self.owner}/{self.repo}:ref:refs/heads/*"]
+        trust_policy = generate_trust_policy.build_trust_policy(subs)
+        if trust_policy != self.trust_policy:
+            self.trust_policy = trust_policy
+            self.trust_policy_output.parent.mkdir(parents=True, exist_ok=True)
+            self.trust_policy_output.write_text(json.dumps(trust_policy, indent=2))
+            print(f"Regenerated trust policy for {len(subs)} repos in {self.trust_policy_output}", flush=True)
+
+    def _load_policy(self, path):
+        path = Path(path).resolve()
+        name = "CustomPolicy" if path == self.policy_file else path.name
+        if path.exists():
+            self.policies[name] = json.loads(path.read_text())
+        else:
+            self.policies.pop(name, None)
+
+    def load_all(self):
+        self._load_trust_policy()
+        self.policies = {}
+        if self.policies_dir.exists():
+            for policy in render_iam_template.load_policy_files(self.policies_dir):
+                self.policies[policy["name"]] = policy["document"]
+        if self.policy_file:
+            self._load_policy(self.policy_file)
+
+    def apply(self, paths):
+        """
+        Rebuilds the inputs affected by the changed paths, re-renders and validates.
+        Returns True if the rendered template changed and passed validation.
+        """
+        kinds = {}
+        for path in paths:
+            kind = self.classify(path)
+            if kind:
+                kinds.setdefault(kind, []).append(path)
+        if not kinds:
+            return False
+        try:
+            if "trust" in kinds:
+                self._load_trust_policy()
+            for path in kinds.get("policy", []):
+                self._load_policy(path)
+            return self.render()
+        except (OSError, ValueError, TemplateError, SystemExit) as e:
+            # Half-saved JSON or template, or a missing file mid-edit; wait for the next change
+            print(f"❌ Could not rebuild after change to {', '.join(map(str, paths))}: {e}", file=sys.stderr, flush=True)
+            return False
+
+    def render(self, notify=True):
+        """
+        Renders and validates the template, replacing the output atomically so a
+        deploy reading it never sees a partial file. Calls on_change (if notify)
+        when the output changed. Returns True if it did.
+        """
+        policies = [{"name": name, "document": doc} for name, doc in self.policies.items()]
+        rendered = render_iam_template.render_template(self.trust_policy, policies, self.owner, self.repo,
+                                                       template_dir=str(self.template_dir))
+        if rendered == self.rendered:
+            print("No effective change to the rendered template.", flush=True)
+            return False
+        errors = validate_rendered(rendered)
+        if errors:
+            print("❌ Rendered template failed validation:", file=sys.stderr, flush=True)
+            for error in errors:
+                print(f"  {error}", file=sys.stderr, flush=True)
+            return False
+        self.rendered = rendered
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=self.output.parent, prefix=f".{self.output.name}.",
+                                         delete=False) as f:
+            f.write(rendered)
+        os.replace(f.name, self.output)
+        print(f"✅ Rendered and validated {self.output}", flush=True)
+        if notify and self.on_change:
+            self.on_change()
+        return True
+
+
+class _ChangeCollector(FileSystemEventHandler):
+    """
+    Collects changed paths from watchdog's observer thread for debounced processing.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = set()
+        self.last_event = 0.0
+
+    def on_any_event(self, event):
+        # Ignore open/close events, which our own template reads would otherwise trigger
+        if event.is_directory or event.event_type not in CONTENT_EVENTS:
+            return
+        with self.lock:
+            self.paths.add(event.src_path)
+            if getattr(event, "dest_path", None):
+                # Editors often save via rename of a temp file
+                self.paths.add(event.dest_path)
+            self.last_event = time.monotonic()
+
+    def take_if_quiet(self, debounce):
+        with self.lock:
+            if self.paths and time.monotonic() - self.last_event >= debounce:
+                paths, self.paths = self.paths, set()
+                return paths
+        return None
+
+
+def start_deploy_worker(stack_name, region, oidc_provider_arn, template_path):
+    """
+    Starts a background worker that deploys the rendered template to the stack whenever a request is queued.
+    The queue holds at most one pending request, so a burst of edits causes one deploy.
+    """
+    requests = queue.Queue(maxsize=1)
+
+    def worker():
+        while True:
+            requests.get()
+            print(f"Deploying stack {stack_name}...", flush=True)
+            try:
+                results, _failures = cfn_deploy.deploy_stacks_streaming([stack_name], region, oidc_provider_arn,
+                                                                       template_path=template_path)
+            except Exception as e:
+                # Keep the worker alive so the next validated change still deploys
+                print(f"❌ Deploy of stack {stack_name} failed: {e}", file=sys.stderr, flush=True)
+                continue
+            res = results[stack_name]
+            print(res.stdout, flush=True)
+            if res.returncode != 0:
+                print(res.stderr, file=sys.stderr, flush=True)
+
+    threading.Thread(target=worker, daemon=True).start()
+
+    def enqueue():
+        try:
+            requests.put_nowait(True)
+        except queue.Full:
+            pass
+    return enqueue
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch policies, the repo list and the template, re-rendering on change")
+    parser.add_argument("--github-org", required=True, help="GitHub organization name")
+    parser.add_argument("--github-repo", required=True, help="GitHub repository name")
+    parser.add_argument("--repos-file", help="Build the trust policy from this repo list instead of --github-org/--github-repo")
+    parser.add_argument("--policies-dir", help="Directory containing policy JSON files (default: policies/)")
+    parser.add_argument("--policy-file", help="Path to custom policy JSON file")
+    parser.add_argument("--output", default="cloudformation/generated/iam_role.yaml", help="Output path for rendered template")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, help="Seconds of quiet before re-rendering")
+    parser.add_argument("--deploy", action="store_true", help="Queue a deploy of the stack after each validated change")
+    parser.add_argument("--stack-name", help="Stack to deploy (default: gha-aws-oidc-<org>-<repo>)")
+    parser.add_argument("--region", default=cfn_deploy.DEFAULT_REGION, help="AWS region for --deploy")
+    parser.add_argument("--oidc-provider-arn", help="OIDC provider ARN for --deploy (looked up if omitted)")
+    args = parser.parse_args()
+
+    on_change = None
+    if args.deploy:
+        stack_name = args.stack_name or f"gha-aws-oidc-{args.github_org.lower()}-{args.github_repo.lower()}"
+        oidc_provider_arn = args.oidc_provider_arn or cfn_deploy.get_or_create_oidc_provider(args.region)
+        on_change = start_deploy_worker(stack_name, args.region, oidc_provider_arn, Path(args.output).resolve())
+
+    session = WatchSession(args.github_org, args.github_repo, repos_file=args.repos_file,
+                           policies_dir=args.policies_dir, policy_file=args.policy_file,
+                           template_dir=str(PROJECT_ROOT / "cloudformation"), output=args.output,
+                           on_change=on_change)
+    session.load_all()
+    # Only edits made while watching trigger a deploy, not the initial render
+    session.render(notify=False)
+
+    collector = _ChangeCollector()
+    observer = Observer()
+    for directory in session.watched_dirs():
+        observer.schedule(collector, os.fspath(directory), recursive=False)
+        print(f"Watching {directory}", flush=True)
+    observer.start()
+    try:
+        while True:
+            time.sleep(0.1)
+            paths = collector.take_if_quiet(args.debounce)
+            if paths:
+                session.apply(paths)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        observer.stop()
+        observer.join()
+
+
+if __name__ == "__main__":
+    main()
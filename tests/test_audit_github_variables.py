@@ -0,0 +1,128 @@
+"""
+test_audit_github_variables.py: Test the batched fleet audit of GHA_OIDC_ROLE_ARN
+User Story: US-140 (see docs/user_stories.md)
+"""
+import re
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import audit_github_variables as audit_gv
+
+ROLE = "arn:aws:iam::123456789012:role/gha-oidc-org-a"
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self.body = body or {}
+        self.headers = headers or {}
+        self.text = str(body)
+    def json(self):
+        return self.body
+    def raise_for_status(self):
+        assert self.ok
+
+class FakeGitHub:
+    """Serves GraphQL repository lookups and REST variable reads with ETags."""
+    def __init__(self, variables, missing_repos=(), archived=()):
+        self.variables = variables
+        self.missing_repos = set(missing_repos)
+        self.archived = set(archived)
+        self.graphql_calls = 0
+        self.rest_calls = []
+    def post(self, url, json):
+        assert url == audit_gv.GRAPHQL_URL
+        self.graphql_calls += 1
+        data = {}
+        for alias in re.findall(r"(r\d+): repository", json["query"]):
+            i = alias[1:]
+            full_name = f"{json['variables']['o' + i]}/{json['variables']['n' + i]}"
+            data[alias] = None if full_name in self.missing_repos else {
+                "nameWithOwner": full_name, "isArchived": full_name in self.archived}
+        return FakeResponse(200, {"data": data})
+    def get(self, url, headers):
+        full_name = url.split("/repos/")[1].split("/actions/")[0]
+        self.rest_calls.append((full_name, headers.get("If-None-Match")))
+        if full_name not in self.variables:
+            return FakeResponse(404)
+        etag = f'"{hash(self.variables[full_name])}"'
+        if headers.get("If-None-Match") == etag:
+            return FakeResponse(304)
+        return FakeResponse(200, {"name": "GHA_OIDC_ROLE_ARN", "value": self.variables[full_name]}, {"ETag": etag})
+
+def test_audit_classifies_repos_and_batches_graphql(tmp_path):
+    repos = ["org/a", "org/b", "org/c", "org/gone", "org/old"] + [f"org/x{i}" for i in range(60)]
+    variables = {"org/a": ROLE, "org/b": "arn:aws:iam::123456789012:role/old"}
+    github = FakeGitHub(variables, missing_repos=["org/gone"], archived=["org/old"])
+    cache = audit_gv.EtagCache(tmp_path / "etags.json")
+    results = audit_gv.audit(github, repos, lambda full_name: ROLE, workers=8, cache=cache)
+    status = {r["repo"]: r["status"] for r in results}
+    assert status["org/a"] == audit_gv.STATUS_CORRECT
+    assert status["org/b"] == audit_gv.STATUS_STALE
+    assert status["org/c"] == audit_gv.STATUS_MISSING
+    assert status["org/gone"] == audit_gv.STATUS_REPO_NOT_FOUND
+    assert status["org/old"] == audit_gv.STATUS_ARCHIVED
+    # 65 repos in batches of 50 -> 2 GraphQL queries; missing/archived repos cost no REST call
+    assert github.graphql_calls == 2
+    assert len(github.rest_calls) == 63
+    assert [r["repo"] for r in results] == repos
+
+def test_second_audit_uses_conditional_requests(tmp_path):
+    github = FakeGitHub({"org/a": ROLE})
+    cache = audit_gv.EtagCache(tmp_path / "etags.json")
+    audit_gv.audit(github, ["org/a"], lambda full_name: ROLE, cache=cache)
+    cache.save()
+    github.rest_calls.clear()
+    results = audit_gv.audit(github, ["org/a"], lambda full_name: ROLE, cache=audit_gv.EtagCache(tmp_path / "etags.json"))
+    assert results[0]["status"] == audit_gv.STATUS_CORRECT
+    assert results[0]["value"] == ROLE
+    assert github.rest_calls[0][1] is not None
+
+def test_rate_limit_is_retried(monkeypatch):
+    monkeypatch.setattr(audit_gv.time, "sleep", lambda s: None)
+    responses = [FakeResponse(429, headers={"Retry-After": "2"}),
+                 FakeResponse(200, {"value": ROLE}, {"ETag": '"1"'})]
+    class Session:
+        def get(self, url, headers):
+            return responses.pop(0)
+    value, error, cached = audit_gv.fetch_variable(Session(), "org/a", "GHA_OIDC_ROLE_ARN", audit_gv.EtagCache())
+    assert (value, error, cached) == (ROLE, None, False)
+
+def test_default_stack_name_matches_deploy_naming():
+    assert audit_gv.default_stack_name("MyOrg/My-Repo") == "gha-aws-oidc-myorg-my-repo"
+    assert audit_gv.org_stack_name("MyOrg/My-Repo") == "gha-aws-oidc-myorg"
+
+def test_expected_arn_falls_back_to_org_stack():
+    expected_for = audit_gv.expected_from_stacks({
+        "gha-aws-oidc-org": "arn:aws:iam::1:role/org",
+        "gha-aws-oidc-org-a": "arn:aws:iam::1:role/a",
+    })
+    assert expected_for("org/a") == "arn:aws:iam::1:role/a"
+    assert expected_for("org/b") == "arn:aws:iam::1:role/org"
+    assert expected_for("other/c") is None
+    assert audit_gv.STATUS_UNKNOWN in audit_gv.FAILING_STATUSES
+
+def test_org_listing_skips_graphql_resolution(tmp_path):
+    github = FakeGitHub({"org/a": ROLE})
+    results = audit_gv.audit(github, ["org/a"], lambda full_name: ROLE, cache=audit_gv.EtagCache(),
+                             repo_info={"org/a": {"archived": False}})
+    assert results[0]["status"] == audit_gv.STATUS_CORRECT
+    assert github.graphql_calls == 0
+
+def test_unseen_listed_repos_fail_the_audit(monkeypatch, tmp_path):
+    github = FakeGitHub({}, missing_repos=["org/a", "org/b"])
+    monkeypatch.setattr(audit_gv, "make_session", lambda token, workers: github)
+    repos = tmp_path / "repos.txt"
+    repos.write_text("org/a\norg/b\n")
+    monkeypatch.setattr(sys, "argv", ["audit_github_variables.py", "--github-org", "org", "--github-token", "t",
+                                      "--repos-file", str(repos), "--expected-arn", ROLE,
+                                      "--etag-cache", str(tmp_path / "etags.json")])
+    with pytest.raises(SystemExit) as exc:
+        audit_gv.main()
+    assert exc.value.code == 1
@@ -0,0 +1,61 @@
+"""
+test_aws_clients.py: Test the shared boto3 client pool and its retry/throttle counters
+User Story: US-100 (see docs/user_stories.md)
+"""
+import sys
+import threading
+from pathlib import Path
+
+from botocore.awsrequest import AWSResponse
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import aws_clients
+
+THROTTLED = (b"<ErrorResponse><Error><Type>Sender</Type><Code>Throttling</Code>"
+             b"<Message>Rate exceeded</Message></Error><RequestId>r1</RequestId></ErrorResponse>")
+IDENTITY = (b"<GetCallerIdentityResponse><GetCallerIdentityResult>"
+            b"<Arn>arn:aws:iam::123456789012:user/ci</Arn><UserId>U</UserId><Account>123456789012</Account>"
+            b"</GetCallerIdentityResult><ResponseMetadata><RequestId>r2</RequestId></ResponseMetadata>"
+            b"</GetCallerIdentityResponse>")
+
+class _Raw:
+    def __init__(self, body):
+        self.body = body
+    def stream(self, **kwargs):
+        yield self.body
+
+def fake_credentials(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.delenv("AWS_PROFILE", raising=False)
+
+def test_clients_are_cached_and_configured(monkeypatch):
+    fake_credentials(monkeypatch)
+    pool = aws_clients.ClientPool(max_pool_connections=64)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(pool.client("sts", "us-east-1"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({id(c) for c in clients}) == 1
+    assert pool.client("sts", "us-west-2") is not clients[0]
+    config = clients[0].meta.config
+    assert config.max_pool_connections == 64
+    assert config.retries["mode"] == "adaptive"
+
+def test_stats_count_throttles_and_retries(monkeypatch):
+    fake_credentials(monkeypatch)
+    # standard mode keeps the test fast; adaptive adds client-side rate limiting on top of it
+    pool = aws_clients.ClientPool(retry_mode="standard", max_attempts=3)
+    sts = pool.client("sts", "us-east-1")
+    responses = [(400, THROTTLED), (200, IDENTITY)]
+    def send(request, **kwargs):
+        status, body = responses.pop(0)
+        return AWSResponse(request.url, status, {}, _Raw(body))
+    sts.meta.events.register("before-send", send)
+    assert sts.get_caller_identity()["Account"] == "123456789012"
+    assert pool.stats() == {"calls": 1, "errors": 0, "retries": 1, "throttles": 1}
@@ -63,7 +63,78 @@ def test_get_or_create_oidc_provider(monkeypatch):
         def create_open_id_connect_provider(self, Url, ClientIDList, ThumbprintList):
             assert Url == "https://token.actions.githubusercontent.com"
             return {"OpenIDConnectProviderArn": "arn:aws:iam::123456789012:oidc-provider/token.actions.githubusercontent.com"}
-    monkeypatch.setattr("boto3.client", lambda service, **kwargs: FakeIAM())
+    monkeypatch.setattr(cfn_deploy.aws_clients, "client", lambda service, region=None, **kwargs: FakeIAM())
     from cfn_deploy import get_or_create_oidc_provider
     arn = get_or_create_oidc_provider(region="us-east-1")
     assert arn == "arn:aws:iam::123456789012:oidc-provider/token.actions.githubusercontent.com"
+
+def test_deploy_stacks_streaming_collects_results(monkeypatch, tmp_path):
+    template = tmp_path / "iam_role.yaml"
+    template.write_text("Resources: {}\n")
+    monkeypatch.setattr(cfn_deploy, "TEMPLATE_PATH", template)
+    class FakePopen:
+        def __init__(self, cmd, stdout, stderr, text):
+            assert "deploy" in cmd
+            stdout.write("Successfully created/updated stack")
+            self.polls = 0
+        def poll(self):
+            self.polls += 1
+            return None if self.polls < 2 else 0
+        def wait(self):
+            return 0
+    class FakeCFN:
+        def describe_stack_events(self, StackName, NextToken=None):
+            return {"StackEvents": []}
+    monkeypatch.setattr(subprocess, "Popen", FakePopen)
+    results, failures = cfn_deploy.deploy_stacks_streaming(["s1", "s2"], poll_interval=0, cloudformation=FakeCFN())
+    assert set(results) == {"s1", "s2"}
+    assert results["s1"].returncode == 0
+    assert "Successfully" in results["s1"].stdout
+    assert failures == {"s1": None, "s2": None}
+
+def test_deploy_stacks_streaming_survives_event_errors(monkeypatch, tmp_path):
+    from botocore.exceptions import ClientError
+    template = tmp_path / "iam_role.yaml"
+    template.write_text("Resources: {}\n")
+    monkeypatch.setattr(cfn_deploy, "TEMPLATE_PATH", template)
+    waited = []
+    class FakePopen:
+        def __init__(self, cmd, stdout, stderr, text):
+            stdout.write("Successfully created/updated stack")
+        def poll(self):
+            return None
+        def wait(self):
+            waited.append(True)
+            return 0
+    class FakeCFN:
+        def describe_stack_events(self, StackName, NextToken=None):
+            raise ClientError({"Error": {"Code": "AccessDenied", "Message": "not authorized"}}, "DescribeStackEvents")
+    monkeypatch.setattr(subprocess, "Popen", FakePopen)
+    results, failures = cfn_deploy.deploy_stacks_streaming(["s1"], poll_interval=0, cloudformation=FakeCFN())
+    assert waited == [True]
+    assert results["s1"].returncode == 0
+    assert "Successfully" in results["s1"].stdout
+    assert failures == {"s1": None}
+
+def test_deploy_stacks_streaming_survives_connection_errors(monkeypatch, tmp_path):
+    from botocore.exceptions import EndpointConnectionError
+    template = tmp_path / "iam_role.yaml"
+    template.write_text("Resources: {}\n")
+    monkeypatch.setattr(cfn_deploy, "TEMPLATE_PATH", template)
+    waited = []
+    class FakePopen:
+        def __init__(self, cmd, stdout, stderr, text):
+            stdout.write("Successfully created/updated stack")
+        def poll(self):
+            return None
+        def wait(self):
+            waited.append(True)
+            return 0
+    class FakeCFN:
+        def describe_stack_events(self, StackName, NextToken=None):
+            raise EndpointConnectionError(endpoint_url="https://cloudformation.us-east-1.amazonaws.com")
+    monkeypatch.setattr(subprocess, "Popen", FakePopen)
+    results, failures = cfn_deploy.deploy_stacks_streaming(["s1", "s2"], poll_interval=0, cloudformation=FakeCFN())
+    assert waited == [True, True]
+    assert results["s2"].returncode == 0
+    assert failures == {"s1": None, "s2": None}
@@ -0,0 +1,113 @@
+"""
+test_permission_index.py: Test the effective-permission index, queries and snapshot diffs
+User Story: US-180 (see docs/user_stories.md)
+"""
+import copy
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import generate_trust_policy
+import permission_index
+import render_iam_template
+
+WRITE_POLICY = {"Version": "2012-10-17", "Statement": [
+    {"Effect": "Allow", "Action": ["s3:Put*", "s3:GetObject"], "Resource": "arn:aws:s3:::bucket-x/*"},
+    {"Effect": "Allow", "Action": "cloudformation:*", "Resource": "*"},
+]}
+DENY_POLICY = {"Version": "2012-10-17", "Statement": [
+    {"Effect": "Deny", "Action": "s3:PutObject", "Resource": "arn:aws:s3:::bucket-x/*"},
+]}
+
+def render(tmp_path, repo, policies):
+    trust = generate_trust_policy.build_trust_policy([f"repo:org/{repo}:ref:refs/heads/*"])
+    docs = [{"name": name, "document": doc} for name, doc in policies.items()]
+    path = tmp_path / f"{repo}.yaml"
+    path.write_text(render_iam_template.render_template(trust, docs, "org", repo,
+                                                        template_dir=str(PROJECT_ROOT / "cloudformation")))
+    return path
+
+def test_query_resolves_wildcard_actions_and_denies(tmp_path):
+    templates = [
+        render(tmp_path, "a", {"write.json": WRITE_POLICY}),
+        render(tmp_path, "b", {"write.json": WRITE_POLICY, "deny.json": DENY_POLICY}),
+    ]
+    index = permission_index.PermissionIndex(permission_index.build_snapshot(templates=templates))
+    grants = index.query("s3:PutObject", "arn:aws:s3:::bucket-x/reports/1.csv")
+    assert {g["role"] for g in grants} == {"gha-oidc-org-a", "gha-oidc-org-b"}
+    assert set(index.effective_roles("S3:PUTOBJECT", "arn:aws:s3:::bucket-x/*")) == {"gha-oidc-org-a"}
+    assert index.effective_roles("s3:PutObject", "arn:aws:s3:::bucket-y/key") == {}
+    assert set(index.effective_roles("cloudformation:CreateStack")) == {"gha-oidc-org-a", "gha-oidc-org-b"}
+    assert index.query("s3:DeleteObject") == []
+
+def test_scoped_deny_does_not_hide_broader_allow(tmp_path):
+    policy = {"Version": "2012-10-17", "Statement": [
+        {"Effect": "Allow", "Action": "s3:PutObject", "Resource": "*"},
+        {"Effect": "Deny", "Action": "s3:PutObject", "Resource": "arn:aws:s3:::secret/*"},
+    ]}
+    index = permission_index.PermissionIndex(permission_index.build_snapshot(
+        templates=[render(tmp_path, "a", {"put.json": policy})]))
+    assert set(index.effective_roles("s3:PutObject")) == {"gha-oidc-org-a"}
+    assert set(index.effective_roles("s3:PutObject", "*")) == {"gha-oidc-org-a"}
+    assert set(index.effective_roles("s3:PutObject", "arn:aws:s3:::public/key")) == {"gha-oidc-org-a"}
+    assert index.effective_roles("s3:PutObject", "arn:aws:s3:::secret/key") == {}
+    assert index.effective_roles("s3:PutObject", "arn:aws:s3:::secret/*") == {}
+
+def test_not_resource_grants_overlap_wildcard_queries(tmp_path):
+    policy = {"Version": "2012-10-17", "Statement": [
+        {"Effect": "Allow", "Action": "s3:PutObject", "NotResource": ["arn:aws:s3:::secret/*", "arn:aws:s3:::logs/*"]},
+        {"Effect": "Deny", "Action": "s3:DeleteObject", "NotResource": ["arn:aws:s3:::tmp/*", "arn:aws:s3:::scratch/*"]},
+        {"Effect": "Allow", "Action": "s3:DeleteObject", "Resource": "*"},
+    ]}
+    index = permission_index.PermissionIndex(permission_index.build_snapshot(
+        templates=[render(tmp_path, "a", {"put.json": policy})]))
+    for resource in ("*", "arn:aws:s3:::*", "arn:aws:s3:::public/key"):
+        assert set(index.effective_roles("s3:PutObject", resource)) == {"gha-oidc-org-a"}
+    assert index.effective_roles("s3:PutObject", "arn:aws:s3:::secret/key") == {}
+    assert index.effective_roles("s3:PutObject", "arn:aws:s3:::logs/*") == {}
+    # The Deny covers everything outside tmp/ and scratch/
+    assert index.effective_roles("s3:DeleteObject", "arn:aws:s3:::public/*") == {}
+    assert set(index.effective_roles("s3:DeleteObject", "arn:aws:s3:::scratch/key")) == {"gha-oidc-org-a"}
+    assert set(index.effective_roles("s3:DeleteObject", "*")) == {"gha-oidc-org-a"}
+
+def test_not_action_statements(tmp_path):
+    policy = {"Statement": [{"Effect": "Allow", "NotAction": ["iam:*", "sts:*"], "Resource": "*"}]}
+    (tmp_path / "broad.json").write_text(json.dumps(policy))
+    index = permission_index.PermissionIndex(permission_index.build_snapshot(policies_dirs=[tmp_path]))
+    assert set(index.effective_roles("s3:PutObject")) == {permission_index.UNATTACHED_ROLE}
+    assert index.effective_roles("iam:CreateRole") == {}
+    assert index.effective_roles("sts:AssumeRole") == {}
+
+def test_diff_snapshots_reports_blast_radius(tmp_path):
+    old = permission_index.build_snapshot(templates=[render(tmp_path, "a", {"write.json": WRITE_POLICY})])
+    new = copy.deepcopy(old)
+    new["grants"] = [g for g in new["grants"] if g["action"] != "cloudformation:*"]
+    new["grants"].append(dict(new["grants"][0], action="s3:DeleteObject"))
+    result = permission_index.diff_snapshots(old, new)
+    assert [g["action"] for g in result["added"]] == ["s3:DeleteObject"]
+    assert [g["action"] for g in result["removed"]] == ["cloudformation:*"]
+    assert permission_index.diff_snapshots(old, old) == {"added": [], "removed": []}
+
+def test_project_policies_are_indexed():
+    snapshot = permission_index.build_snapshot(policies_dirs=[PROJECT_ROOT / "policies"])
+    names = {g["policy"] for g in snapshot["grants"]}
+    assert "s3.json" in names
+    assert not any(name.endswith("-example.json") for name in names)
+
+def test_default_build_counts_only_rendered_roles(monkeypatch, tmp_path, capsys):
+    generated = tmp_path / "cloudformation" / "generated"
+    generated.mkdir(parents=True)
+    policies = {p["name"]: p["document"] for p in render_iam_template.load_policy_files(PROJECT_ROOT / "policies")}
+    render(generated, "a", policies)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sys, "argv", ["permission_index.py", "build"])
+    permission_index.main()
+    monkeypatch.setattr(sys, "argv", ["permission_index.py", "query", "--action", "s3:PutObject", "--json"])
+    capsys.readouterr()
+    permission_index.main()
+    assert set(json.loads(capsys.readouterr().out)) == {"gha-oidc-org-a"}
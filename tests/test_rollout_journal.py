@@ -0,0 +1,50 @@
+"""
+test_rollout_journal.py: Test the append-only rollout journal used by --resume
+User Story: US-150 (see docs/user_stories.md)
+"""
+import sys
+import threading
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import rollout_journal
+
+def test_latest_entry_wins(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    rollout_journal.append_entry(journal, "repo", "org/a:VAR", rollout_journal.STATUS_STARTED, "fp1")
+    rollout_journal.append_entry(journal, "repo", "org/a:VAR", rollout_journal.STATUS_SUCCEEDED, "fp1")
+    rollout_journal.append_entry(journal, "repo", "org/b:VAR", rollout_journal.STATUS_FAILED, "fp1", detail="403")
+    latest = rollout_journal.load_latest(journal)
+    assert latest[("repo", "org/a:VAR")]["status"] == "succeeded"
+    assert latest[("repo", "org/b:VAR")]["detail"] == "403"
+    assert rollout_journal.summarize(journal) == {"repo": {"succeeded": 1, "failed": 1}}
+
+def test_pending_keys_respects_fingerprint(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    rollout_journal.append_entry(journal, "repo", "org/a:VAR", rollout_journal.STATUS_SUCCEEDED, "old")
+    rollout_journal.append_entry(journal, "repo", "org/b:VAR", rollout_journal.STATUS_SUCCEEDED, "new")
+    keys = ["org/a:VAR", "org/b:VAR", "org/c:VAR"]
+    assert rollout_journal.pending_keys(journal, "repo", keys, "new") == ["org/a:VAR", "org/c:VAR"]
+
+def test_truncated_line_is_ignored(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    rollout_journal.append_entry(journal, "stack", "us-east-1/s", rollout_journal.STATUS_SUCCEEDED)
+    with journal.open("a") as f:
+        f.write('{"kind": "stack", "key": "us-east-1/s", "sta')
+    assert rollout_journal.is_done(rollout_journal.load_latest(journal), "stack", "us-east-1/s")
+
+def test_concurrent_writers_do_not_interleave(tmp_path):
+    journal = tmp_path / "journal.jsonl"
+    def worker(n):
+        for i in range(50):
+            rollout_journal.append_entry(journal, "repo", f"org/r{n}-{i}:VAR", rollout_journal.STATUS_SUCCEEDED, detail="x" * 500)
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(rollout_journal.load_latest(journal)) == 400
+    assert len(journal.read_text().splitlines()) == 400
@@ -45,3 +45,36 @@ def test_set_repo_variable_failure(monkeypatch, capsys):
     mock_post.assert_not_called()
     err = capsys.readouterr().err
     assert "❌ Failed to update variable 'VAR' for org/repo" in err
+
+def test_set_repo_variables_resume_skips_done(monkeypatch, tmp_path):
+    # Only the repo that failed in the previous run should be retried
+    journal = tmp_path / "journal.jsonl"
+    calls = []
+    results = {"a": True, "b": False}
+    monkeypatch.setattr(set_gv, "set_repo_variable", lambda org, repo, *a: calls.append(repo) or results[repo])
+    failed = set_gv.set_repo_variables([("org", "a"), ("org", "b")], "VAR", "VAL", "token", journal_path=journal)
+    assert failed == [("org", "b")]
+    calls.clear()
+    results["b"] = True
+    failed = set_gv.set_repo_variables([("org", "a"), ("org", "b")], "VAR", "VAL", "token", journal_path=journal, resume=True)
+    assert failed == []
+    assert calls == ["b"]
+    # A new value invalidates earlier successes
+    calls.clear()
+    set_gv.set_repo_variables([("org", "a"), ("org", "b")], "VAR", "NEW", "token", journal_path=journal, resume=True)
+    assert calls == ["a", "b"]
+
+def test_main_exits_nonzero_with_resume_hint_on_failures(monkeypatch, tmp_path, capsys):
+    journal = tmp_path / "journal.jsonl"
+    monkeypatch.setattr(set_gv, "set_repo_variable", lambda org, repo, *a: repo == "a")
+    repos = tmp_path / "repos.txt"
+    repos.write_text("org/a\norg/b\n")
+    monkeypatch.setattr(sys, "argv", ["set_github_variable.py", "--github-org", "org", "--github-token", "t",
+                                      "--var-name", "VAR", "--var-value", "VAL", "--repos-file", str(repos),
+                                      "--journal", str(journal), "--state-db", str(tmp_path / "state.db")])
+    with pytest.raises(SystemExit) as exc:
+        set_gv.main()
+    assert exc.value.code == 1
+    err = capsys.readouterr().err
+    assert "org/b" in err and "org/a" not in err
+    assert "--resume" in err
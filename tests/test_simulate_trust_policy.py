@@ -0,0 +1,64 @@
+"""
+test_simulate_trust_policy.py: Test local simulation of OIDC sub claims against the trust policy
+User Story: US-150 (see docs/user_stories.md)
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import generate_trust_policy
+import simulate_trust_policy as sim
+
+def test_wildcard_semantics():
+    assert sim.wildcard_to_regex("repo:org/a:ref:refs/heads/*").fullmatch("repo:org/a:ref:refs/heads/feature/x")
+    assert sim.wildcard_to_regex("repo:org/?:pull_request").fullmatch("repo:org/a:pull_request")
+    assert not sim.wildcard_to_regex("repo:org/?:pull_request").fullmatch("repo:org/ab:pull_request")
+    # StringLike is case-sensitive and dots are literal
+    assert not sim.wildcard_to_regex("repo:org/a.b:*").fullmatch("repo:org/aXb:pull_request")
+    assert not sim.wildcard_to_regex("repo:Org/a:*").fullmatch("repo:org/a:pull_request")
+
+def test_generated_policy_accepts_branches_only():
+    policy = generate_trust_policy.build_trust_policy(["repo:org/a:ref:refs/heads/*", "repo:org/b:ref:refs/heads/*"])
+    simulator = sim.TrustPolicySimulator(policy)
+    report = simulator.simulate(sim.synthetic_claims(["org/a", "org/c"]))
+    assert report["claims"] == 8
+    assert report["accepted"] == 1
+    assert report["by_kind"]["branch"] == {"accepted": 1, "denied": 1}
+    assert report["by_kind"]["pull_request"] == {"accepted": 0, "denied": 2}
+    assert report["unreachable_patterns"] == ["repo:org/b:ref:refs/heads/*"]
+    assert "repo:org/a:ref:refs/tags/v1.0.0" in report["denied_samples"]
+
+def test_string_equals_and_unbucketed_patterns():
+    policy = {"Statement": [{
+        "Effect": "Allow",
+        "Action": "sts:AssumeRoleWithWebIdentity",
+        "Condition": {"StringLike": {sim.SUB_KEY: ["repo:org/*:environment:prod", "org/a:ref:refs/heads/main"]}},
+    }, {
+        "Effect": "Allow",
+        "Action": ["sts:AssumeRoleWithWebIdentity"],
+        "Condition": {"StringEquals": {sim.SUB_KEY: "repo:org/a:pull_request"}},
+    }]}
+    simulator = sim.TrustPolicySimulator(policy)
+    assert simulator.evaluate("repo:org/x:environment:prod")[0]
+    assert simulator.evaluate("repo:org/a:pull_request")[0]
+    assert not simulator.evaluate("repo:org/a:ref:refs/heads/main")[0]
+    report = simulator.simulate(["repo:org/x:environment:prod"])
+    assert report["malformed_patterns"] == ["org/a:ref:refs/heads/main"]
+
+def test_cli_reads_json_lines_and_fails_on_denied(tmp_path):
+    policy_path = tmp_path / "trust_policy.json"
+    policy_path.write_text(json.dumps(generate_trust_policy.build_trust_policy(["repo:org/a:ref:refs/heads/*"])))
+    claims = tmp_path / "claims.jsonl"
+    claims.write_text('{"sub": "repo:org/a:ref:refs/heads/main"}\nrepo:org/a:pull_request\n')
+    script = Path(__file__).parent.parent / "src" / "simulate_trust_policy.py"
+    result = subprocess.run([sys.executable, str(script), "--trust-policy", str(policy_path),
+                             "--claims-file", str(claims), "--json", "--fail-on-denied"],
+                            capture_output=True, text=True)
+    assert result.returncode == 1
+    report = json.loads(result.stdout)
+    assert (report["accepted"], report["denied"]) == (1, 1)
@@ -0,0 +1,74 @@
+"""
+test_stack_events.py: Test incremental CloudFormation stack event streaming
+User Story: US-100 (see docs/user_stories.md)
+"""
+import io
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import stack_events
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def event(n, status="CREATE_IN_PROGRESS", resource="GitHubActionsOIDCRole", reason=None):
+    e = {"EventId": f"e{n}", "Timestamp": T0 + timedelta(seconds=n),
+         "LogicalResourceId": resource, "ResourceStatus": status}
+    if reason:
+        e["ResourceStatusReason"] = reason
+    return e
+
+class FakeCFN:
+    """Serves events newest-first in pages of two, like describe_stack_events."""
+    def __init__(self, events):
+        self.events = events
+        self.calls = 0
+        self.cancelled = []
+    def describe_stack_events(self, StackName, NextToken=None):
+        self.calls += 1
+        newest_first = list(reversed(self.events[StackName]))
+        start = int(NextToken or 0)
+        page = {"StackEvents": newest_first[start:start + 2]}
+        if start + 2 < len(newest_first):
+            page["NextToken"] = str(start + 2)
+        return page
+    def cancel_update_stack(self, StackName):
+        self.cancelled.append(StackName)
+
+def test_cursor_only_returns_new_events():
+    cfn = FakeCFN({"s": [event(0), event(1), event(2)]})
+    cursor = stack_events.StackEventCursor(cfn, "s", since=T0 + timedelta(seconds=1))
+    assert [e["EventId"] for e in cursor.poll()] == ["e1", "e2"]
+    cfn.events["s"] += [event(3), event(4)]
+    cfn.calls = 0
+    assert [e["EventId"] for e in cursor.poll()] == ["e3", "e4"]
+    # Cursor sits on the first page, so the old history is not re-fetched
+    assert cfn.calls == 2
+    assert cursor.poll() == []
+
+def test_follow_stacks_multiplexes_and_reports_first_failure():
+    cfn = FakeCFN({
+        "a": [event(0), event(1, "CREATE_COMPLETE")],
+        "b": [event(0), event(1, "CREATE_FAILED", reason="Access denied"), event(2, "ROLLBACK_IN_PROGRESS", "b")],
+    })
+    out = io.StringIO()
+    failed = []
+    first = stack_events.follow_stacks(
+        cfn, ["a", "b"], is_running=lambda name: False,
+        on_failure=lambda name, e: failed.append(name), poll_interval=0, out=out, since=T0,
+    )
+    assert first["a"] is None
+    assert first["b"]["EventId"] == "e1"
+    assert failed == ["b"]
+    text = out.getvalue()
+    assert "[a]" in text and "[b]" in text
+    assert "First failure: GitHubActionsOIDCRole CREATE_FAILED - Access denied" in text
+
+def test_cancel_update_calls_api():
+    cfn = FakeCFN({})
+    assert stack_events.cancel_update(cfn, "s") is True
+    assert cfn.cancelled == ["s"]
@@ -0,0 +1,105 @@
+"""
+test_state_store.py: Test the local SQLite stack/role state store
+User Story: US-180 (see docs/user_stories.md)
+"""
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import generate_trust_policy
+import render_iam_template
+import state_store
+
+ROLE_A = "arn:aws:iam::123456789012:role/gha-oidc-org-a"
+ROLE_B = "arn:aws:iam::123456789012:role/gha-oidc-org-b"
+ROLE_C = "arn:aws:iam::123456789012:role/gha-oidc-org-c"
+
+def test_repo_status_joins_variable_to_stack(tmp_path):
+    conn = state_store.connect(tmp_path / "state.db")
+    state_store.record_stack(conn, "gha-aws-oidc-org-a", "us-east-1", ROLE_A, "t1", "p1", deployed=True)
+    state_store.record_variable_sync(conn, "org/a", "GHA_OIDC_ROLE_ARN", ROLE_A)
+    status = state_store.repo_status(conn, "org/a", current_policy_hash="p1")
+    assert status["stack_name"] == "gha-aws-oidc-org-a"
+    assert status["account_id"] == "123456789012"
+    assert status["current"] is True
+    assert state_store.repo_status(conn, "org/a", current_policy_hash="p2")["current"] is False
+    assert state_store.repo_status(conn, "org/missing") is None
+
+def test_fleet_status_flags_unknown_roles_and_outdated_stacks(tmp_path):
+    conn = state_store.connect(tmp_path / "state.db")
+    state_store.record_stack(conn, "gha-aws-oidc-org-a", "us-east-1", ROLE_A, "t1", "p1", deployed=True)
+    state_store.record_stack(conn, "gha-aws-oidc-org-b", "us-west-2", ROLE_B, "t2", "p0", deployed=True)
+    state_store.record_variable_sync(conn, "org/a", "GHA_OIDC_ROLE_ARN", ROLE_A)
+    state_store.record_variable_sync(conn, "org/c", "GHA_OIDC_ROLE_ARN", "arn:aws:iam::123456789012:role/gone")
+    summary = state_store.fleet_status(conn, current_policy_hash="p1")
+    assert summary["stacks"] == 2
+    assert summary["repos"] == 2
+    assert summary["unknown_role_repos"] == ["org/c"]
+    assert summary["outdated_stacks"] == ["us-west-2/gha-aws-oidc-org-b"]
+
+def test_refresh_keeps_hashes_and_uses_paginator(tmp_path):
+    conn = state_store.connect(tmp_path / "state.db")
+    state_store.record_stack(conn, "gha-aws-oidc-org-a", "us-east-1", ROLE_A, "t1", "p1", deployed=True)
+    pages = [
+        {"Stacks": [{"StackName": "gha-aws-oidc-org-a", "StackStatus": "UPDATE_COMPLETE",
+                     "Outputs": [{"OutputKey": "RoleArn", "OutputValue": ROLE_A}]},
+                    {"StackName": "unrelated", "StackStatus": "CREATE_COMPLETE"}]},
+        {"Stacks": [{"StackName": "gha-aws-oidc-org-b", "StackStatus": "CREATE_COMPLETE",
+                     "Outputs": [{"OutputKey": "RoleArn", "OutputValue": ROLE_B}]}]},
+    ]
+    class FakeCFN:
+        def get_paginator(self, name):
+            assert name == "describe_stacks"
+            return type("P", (), {"paginate": lambda self: iter(pages)})()
+    assert state_store.refresh_from_aws(conn, "us-east-1", cloudformation=FakeCFN()) == (2, 0)
+    rows = {r["stack_name"]: dict(r) for r in conn.execute("SELECT * FROM stacks")}
+    assert set(rows) == {"gha-aws-oidc-org-a", "gha-aws-oidc-org-b"}
+    assert rows["gha-aws-oidc-org-a"]["policy_hash"] == "p1"
+    assert rows["gha-aws-oidc-org-a"]["deployed_at"] is not None
+    assert rows["gha-aws-oidc-org-b"]["deployed_at"] is None
+
+def test_refresh_removes_deleted_stacks(tmp_path):
+    conn = state_store.connect(tmp_path / "state.db")
+    state_store.record_stack(conn, "gha-aws-oidc-org-a", "us-east-1", ROLE_A, "t1", "p1", deployed=True)
+    state_store.record_stack(conn, "gha-aws-oidc-org-b", "us-east-1", ROLE_B, "t1", "p1", deployed=True)
+    state_store.record_stack(conn, "gha-aws-oidc-org-b", "us-west-2", ROLE_B, "t1", "p1", deployed=True)
+    state_store.record_stack(conn, "gha-aws-oidc-org-c", "us-east-1", ROLE_C, "t1", "p1", deployed=True)
+    state_store.record_stack(conn, "other-stack", "us-east-1", ROLE_B)
+    state_store.record_variable_sync(conn, "org/b", "GHA_OIDC_ROLE_ARN", ROLE_B)
+    state_store.record_variable_sync(conn, "org/c", "GHA_OIDC_ROLE_ARN", ROLE_C)
+    assert state_store.repo_status(conn, "org/c")["current"] is True
+    pages = [{"Stacks": [{"StackName": "gha-aws-oidc-org-a", "StackStatus": "UPDATE_COMPLETE",
+                          "Outputs": [{"OutputKey": "RoleArn", "OutputValue": ROLE_A}]},
+                         {"StackName": "gha-aws-oidc-org-b", "StackStatus": "DELETE_COMPLETE"}]}]
+    class FakeCFN:
+        def get_paginator(self, name):
+            return type("P", (), {"paginate": lambda self: iter(pages)})()
+    assert state_store.refresh_from_aws(conn, "us-east-1", cloudformation=FakeCFN()) == (1, 2)
+    rows = {(r["stack_name"], r["region"]) for r in conn.execute("SELECT * FROM stacks")}
+    assert rows == {("gha-aws-oidc-org-a", "us-east-1"), ("gha-aws-oidc-org-b", "us-west-2"), ("other-stack", "us-east-1")}
+    # Only the us-west-2 stack still backs the role
+    assert state_store.repo_status(conn, "org/b")["region"] == "us-west-2"
+    assert state_store.repo_status(conn, "org/c")["current"] is False
+    assert state_store.fleet_status(conn)["unknown_role_repos"] == ["org/c"]
+
+def test_template_hashes_track_policy_set(tmp_path):
+    template_dir = str(Path(__file__).parent.parent / "cloudformation")
+    s3 = {"name": "s3.json", "document": {"Version": "2012-10-17", "Statement": [
+        {"Effect": "Allow", "Action": "s3:GetObject", "Resource": "*"}]}}
+    ec2 = {"name": "ec2.json", "document": {"Version": "2012-10-17", "Statement": [
+        {"Effect": "Allow", "Action": "ec2:Describe*", "Resource": "*"}]}}
+    def hashes(name, repos, policies):
+        trust_policy = generate_trust_policy.build_trust_policy([f"repo:{r}:ref:refs/heads/*" for r in repos])
+        path = tmp_path / name
+        path.write_text(render_iam_template.render_template(trust_policy, policies, "org", "a", template_dir))
+        return state_store.template_hashes(path)
+    base = hashes("base.yaml", ["org/a"], [s3])
+    new_trust = hashes("trust.yaml", ["org/a", "org/b"], [s3])
+    new_policies = hashes("policies.yaml", ["org/a"], [s3, ec2])
+    assert new_trust[0] != base[0]
+    assert new_trust[1] == base[1]
+    assert new_policies[0] != base[0]
+    assert new_policies[1] != base[1]
@@ -0,0 +1,106 @@
+"""
+test_watch.py: Test incremental re-rendering for watch mode
+User Story: US-110 (see docs/user_stories.md)
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SRC_DIR = PROJECT_ROOT / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+import watch
+
+POLICY = {"Version": "2012-10-17", "Statement": [{"Effect": "Allow", "Action": "s3:GetObject", "Resource": "*"}]}
+
+def make_session(tmp_path, changes):
+    policies = tmp_path / "policies"
+    policies.mkdir()
+    (policies / "s3.json").write_text(json.dumps(POLICY))
+    (policies / "s3-example.json").write_text(json.dumps(POLICY))
+    repos = tmp_path / "allowed_repos.txt"
+    repos.write_text("org/a\n")
+    session = watch.WatchSession(
+        "org", "a", repos_file=repos, policies_dir=policies,
+        template_dir=PROJECT_ROOT / "cloudformation",
+        output=tmp_path / "out" / "iam_role.yaml",
+        trust_policy_output=tmp_path / "out" / "trust_policy.json",
+        on_change=lambda: changes.append(True),
+    )
+    session.load_all()
+    assert session.render(notify=False)
+    return session, policies, repos
+
+def test_classify_paths(tmp_path):
+    session, policies, repos = make_session(tmp_path, [])
+    assert session.classify(repos) == "trust"
+    assert session.classify(policies / "new.json") == "policy"
+    assert session.classify(policies / "s3-example.json") is None
+    assert session.classify(PROJECT_ROOT / "cloudformation" / "iam_role.template.j2") == "template"
+    assert session.classify(tmp_path / "unrelated.txt") is None
+
+def test_repo_list_change_regenerates_trust_policy(tmp_path):
+    changes = []
+    session, policies, repos = make_session(tmp_path, changes)
+    repos.write_text("org/a\norg/b\n")
+    assert session.apply([str(repos)])
+    trust = json.loads((tmp_path / "out" / "trust_policy.json").read_text())
+    subs = trust["Statement"][0]["Condition"]["StringLike"]["token.actions.githubusercontent.com:sub"]
+    assert subs == ["repo:org/a:ref:refs/heads/*", "repo:org/b:ref:refs/heads/*"]
+    assert "repo:org/b:ref:refs/heads/*" in (tmp_path / "out" / "iam_role.yaml").read_text()
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["iam_role.yaml", "trust_policy.json"]
+    assert len(changes) == 1
+
+def test_unchanged_or_invalid_output_is_not_written(tmp_path):
+    changes = []
+    session, policies, repos = make_session(tmp_path, changes)
+    (policies / "s3.json").write_text(json.dumps(POLICY))
+    assert not session.apply([str(policies / "s3.json")])
+    (policies / "bad.json").write_text(json.dumps({"Version": "2012-10-17", "Statement": [{"Effect": "Allow"}]}))
+    assert not session.apply([str(policies / "bad.json")])
+    (policies / "half.json").write_text("{")
+    assert not session.apply([str(policies / "half.json")])
+    assert changes == []
+
+def test_validate_rendered_flags_missing_role():
+    assert watch.validate_rendered("Resources: {}\n") == ["GitHubActionsOIDCRole (AWS::IAM::Role) is missing"]
+
+def test_deploy_worker_deploys_rendered_output(monkeypatch, tmp_path):
+    import subprocess
+    import threading
+    deployed = threading.Event()
+    calls = []
+    def fake_deploy(stack_names, region, oidc_provider_arn, template_path=None):
+        calls.append((stack_names, template_path))
+        deployed.set()
+        return {stack_names[0]: subprocess.CompletedProcess([], 0, "ok", "")}, {}
+    monkeypatch.setattr(watch.cfn_deploy, "deploy_stacks_streaming", fake_deploy)
+    output = tmp_path / "custom.yaml"
+    enqueue = watch.start_deploy_worker("stack", "us-east-1", "arn:provider", output)
+    enqueue()
+    assert deployed.wait(5)
+    assert calls == [(["stack"], output)]
+
+def test_deploy_worker_survives_a_failed_deploy(monkeypatch, tmp_path):
+    import subprocess
+    import threading
+    attempts = []
+    second = threading.Event()
+    def fake_deploy(stack_names, region, oidc_provider_arn, template_path=None):
+        attempts.append(True)
+        if len(attempts) == 1:
+            raise FileNotFoundError("Template not found")
+        second.set()
+        return {stack_names[0]: subprocess.CompletedProcess([], 0, "ok", "")}, {}
+    monkeypatch.setattr(watch.cfn_deploy, "deploy_stacks_streaming", fake_deploy)
+    enqueue = watch.start_deploy_worker("stack", "us-east-1", "arn:provider", tmp_path / "out.yaml")
+    enqueue()
+    deadline = time.monotonic() + 5
+    while not attempts and time.monotonic() < deadline:
+        time.sleep(0.01)
+    enqueue()
+    assert second.wait(5)
+    assert len(attempts) == 2